@@ -1,10 +1,10 @@
 from pathlib import Path
 
 import toml
-from dagster_components.resources import PostGISResource
 
 import dagster as dg
 from jat_slides.defs.managers import (
+    ArrayIOManager,
     DataFrameIOManager,
     PathIOManager,
     PlotFigIOManager,
@@ -13,7 +13,11 @@ from jat_slides.defs.managers import (
     ReprojectedRasterIOManager,
     TextIOManager,
 )
-from jat_slides.defs.resources import ConfigResource, PathResource
+from jat_slides.defs.resources import (
+    ConfigResource,
+    PathResource,
+    PooledPostGISResource,
+)
 
 
 @dg.definitions
@@ -55,7 +59,7 @@ def definitions() -> dg.Definitions:
         overlays=config.get("overlays"),
     )
 
-    postgis_resource = PostGISResource(
+    postgis_resource = PooledPostGISResource(
         host=dg.EnvVar("POSTGRES_HOST"),
         port=dg.EnvVar("POSTGRES_PORT"),
         user=dg.EnvVar("POSTGRES_USER"),
@@ -66,6 +70,10 @@ def definitions() -> dg.Definitions:
     # Managers
     csv_manager = DataFrameIOManager(path_resource=path_resource, extension=".csv")
     gpkg_manager = DataFrameIOManager(path_resource=path_resource, extension=".gpkg")
+    parquet_manager = DataFrameIOManager(
+        path_resource=path_resource,
+        extension=".parquet",
+    )
     memory_manager = dg.InMemoryIOManager()
     raster_manager = RasterIOManager(path_resource=path_resource, extension=".tif")
     reprojected_raster_manager = ReprojectedRasterIOManager(
@@ -79,7 +87,12 @@ def definitions() -> dg.Definitions:
     )
     plot_manager = PlotFigIOManager(path_resource=path_resource, extension=".jpg")
     path_manager = PathIOManager(path_resource=path_resource, extension=".jpg")
+    parquet_path_manager = PathIOManager(
+        path_resource=path_resource,
+        extension=".parquet",
+    )
     text_manager = TextIOManager(path_resource=path_resource, extension=".txt")
+    array_manager = ArrayIOManager(path_resource=path_resource, extension=".npz")
 
     # Out
     extra_defs = dg.Definitions(
@@ -89,13 +102,16 @@ def definitions() -> dg.Definitions:
             "mun_config_resource": mun_config,
             "csv_manager": csv_manager,
             "gpkg_manager": gpkg_manager,
+            "parquet_manager": parquet_manager,
             "memory_manager": memory_manager,
             "presentation_manager": presentation_manger,
             "raster_manager": raster_manager,
             "reprojected_raster_manager": reprojected_raster_manager,
             "plot_manager": plot_manager,
             "path_manager": path_manager,
+            "parquet_path_manager": parquet_path_manager,
             "text_manager": text_manager,
+            "array_manager": array_manager,
             "postgis_resource": postgis_resource,
         },
     )
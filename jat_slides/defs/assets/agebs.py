@@ -3,39 +3,55 @@ from dagster_components.partitions import zone_partitions
 from dagster_components.resources import PostGISResource
 
 import dagster as dg
+from jat_slides.defs.queries import read_geometry_query
+from jat_slides.defs.resources import PathResource
+from jat_slides.defs.store import GeoParquetStore
+from jat_slides.defs.validity import get_validity_table_path, repair_geometries
+
+
+@dg.asset(
+    name="national",
+    key_prefix="agebs",
+    io_manager_key="parquet_manager",
+    group_name="agebs",
+    metadata={"partition_col": "CVE_MET"},
+)
+def agebs_national(
+    context: dg.AssetExecutionContext,
+    path_resource: PathResource,
+    postgis_resource: PostGISResource,
+) -> gpd.GeoDataFrame:
+    df = read_geometry_query(postgis_resource, "agebs_national").to_crs("ESRI:54009")
+
+    df, stats = repair_geometries(
+        df,
+        get_validity_table_path(path_resource.data_path, "agebs_national"),
+    )
+    context.add_output_metadata(stats)
+    return df
 
 
 def agebs_factory(year: int) -> dg.AssetsDefinition:
     @dg.asset(
         name=str(year),
         key_prefix="agebs",
+        ins={"store": dg.AssetIn(["agebs", "national"])},
         partitions_def=zone_partitions,
         io_manager_key="gpkg_manager",
+        metadata={"crs": "ESRI:54009"},
         group_name="agebs",
     )
     def _asset(
         context: dg.AssetExecutionContext,
-        postgis_resource: PostGISResource,
+        store: GeoParquetStore | None,
     ) -> gpd.GeoDataFrame:
-        zone = context.partition_key
-
-        with postgis_resource.connect() as conn:
-            return (
-                gpd.read_postgis(
-                    """
-                SELECT census_2020_ageb.geometry, census_2020_ageb."POBTOT"
-                    FROM census_2020_ageb
-                INNER JOIN census_2020_mun
-                    ON census_2020_ageb."CVE_MUN" = census_2020_mun."CVEGEO"
-                WHERE census_2020_mun."CVE_MET" = %(zone)s
-                """,
-                    conn,
-                    params={"zone": zone},
-                    geom_col="geometry",
-                )
-                .to_crs("ESRI:54009")
-                .assign(geometry=lambda df: df["geometry"].make_valid())
+        if store is None or context.partition_key not in store:
+            return gpd.GeoDataFrame(
+                columns=["CVEGEO", "POBTOT"],
+                geometry=[],
+                crs="ESRI:54009",
             )
+        return store.read(context.partition_key, columns=["CVEGEO", "POBTOT"])
 
     return _asset
 
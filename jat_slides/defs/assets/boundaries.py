@@ -0,0 +1,60 @@
+import functools
+import os
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from dagster_components.resources import PostGISResource
+
+import dagster as dg
+from jat_slides.defs.queries import read_geometry_query
+
+
+class BoundaryLayer:
+    def __init__(self, df: gpd.GeoDataFrame) -> None:
+        self.df = df
+        self.tree = shapely.STRtree(df["geometry"].to_numpy())
+
+    def query(
+        self,
+        xmin: float,
+        ymin: float,
+        xmax: float,
+        ymax: float,
+    ) -> gpd.GeoDataFrame:
+        bbox = shapely.box(xmin, ymin, xmax, ymax)
+        idx = self.tree.query(bbox, predicate="intersects")
+        return self.df.iloc[np.sort(idx)]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_boundary_layer(fpath: Path, mtime_ns: int) -> BoundaryLayer:  # noqa: ARG001
+    return BoundaryLayer(gpd.read_parquet(fpath))
+
+
+def load_boundary_layer(fpath: os.PathLike | str) -> BoundaryLayer:
+    # Layers are kept per process, keyed by modification time so a new
+    # materialization is picked up.
+    fpath = Path(fpath)
+    return _load_boundary_layer(fpath, fpath.stat().st_mtime_ns)
+
+
+def boundaries_factory(level: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name=level,
+        key_prefix="boundaries",
+        io_manager_key="parquet_manager",
+        group_name="boundaries",
+    )
+    def _asset(postgis_resource: PostGISResource) -> gpd.GeoDataFrame:
+        df = read_geometry_query(postgis_resource, f"boundaries_{level}").to_crs(
+            "EPSG:4326",
+        )
+        points = df["geometry"].representative_point()
+        return df.assign(rep_x=points.x, rep_y=points.y)
+
+    return _asset
+
+
+boundaries = [boundaries_factory(level) for level in ("mun", "ent")]
@@ -1,132 +1,99 @@
-from pathlib import Path
-
 import geopandas as gpd
 import numpy as np
-import rasterio as rio
-import rasterio.mask as rio_mask
-import shapely
+import rasterio.features as rio_features
+import rasterio.windows as rio_windows
 from affine import Affine
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
+from jat_slides.defs.assets.ghsl import GHSL_YEARS, NODATA, get_band
 from jat_slides.defs.partitions import mun_partitions
-from jat_slides.defs.resources import PathResource
-
-YEARS = range(1975, 2021, 5)
-
-
-def load_built_rasters_factory(year: int) -> dg.OpDefinition:
-    @dg.op(
-        name=f"load_built_rasters_{year}",
-        out={"data": dg.Out(), "transform": dg.Out()},
-    )
-    def _op(
-        path_resource: PathResource,
-        bounds: list[shapely.Geometry],
-    ) -> tuple[np.ndarray, Affine]:
-        fpath = Path(path_resource.ghsl_path) / "BUILT_100" / f"{year}.tif"
-        with rio.open(fpath, nodata=65535) as ds:
-            data, transform = rio_mask.mask(ds, bounds, crop=True, nodata=0)
-
-        data[data == 65535] = 0
-
-        mask = data[0] >= (100 * 100 * 0.2)
-        mask = mask.astype(float)
-        mask[mask == 0] = np.nan
-        mask *= year
-
-        return mask, transform
+from jat_slides.defs.raster import LazyRaster
 
-    return _op
 
+class BuiltConfig(dg.Config):
+    # Minimum built-up fraction of a cell to consider it built.
+    threshold: float = 0.2
+    # Rows processed at a time. None processes the whole window at once.
+    block_rows: int | None = None
 
-load_built_rasters_ops = {year: load_built_rasters_factory(year) for year in YEARS}
 
-
-@dg.op(out=dg.Out(io_manager_key="raster_manager"))
-def reduce_rasters(
-    rasters: list[np.ndarray],
-    transforms: list[Affine],
+@dg.op(
+    ins={"ghsl": dg.In(metadata={"lazy": True})},
+    out=dg.Out(io_manager_key="raster_manager"),
+)
+def reduce_built_rasters(
+    config: BuiltConfig,
+    ghsl: LazyRaster,
+    footprint: gpd.GeoDataFrame,
 ) -> tuple[np.ndarray, Affine]:
-    arr = np.array(rasters)
-    arr = np.nanmin(arr, axis=0)
-    arr[np.isnan(arr)] = 0
-    arr = arr.astype(int)
-    return arr, transforms[0]
-
-
-@dg.op
-def get_total_bounds(
-    agebs_1990: gpd.GeoDataFrame,
-    agebs_2000: gpd.GeoDataFrame,
-    agebs_2010: gpd.GeoDataFrame,
-    agebs_2020: gpd.GeoDataFrame,
-) -> list:
-    geoms = np.concatenate(
-        [
-            agebs_1990["geometry"].to_numpy(),
-            agebs_2000["geometry"].to_numpy(),
-            agebs_2010["geometry"].to_numpy(),
-            agebs_2020["geometry"].to_numpy(),
-        ],
+    outside = rio_features.geometry_mask(
+        footprint["geometry"].tolist(),
+        out_shape=ghsl.shape,
+        transform=ghsl.transform,
     )
-    return [shapely.union_all(geoms)]
+
+    cell_area = abs(ghsl.transform.a * ghsl.transform.e)
+    threshold = cell_area * config.threshold
+
+    # Years are folded in chronological order, so each cell keeps the first
+    # year it was built and no per-year copies are held.
+    out = np.zeros(ghsl.shape, dtype=np.uint16)
+    block_rows = config.block_rows or ghsl.height
+    for row_off in range(0, ghsl.height, block_rows):
+        window = rio_windows.Window(
+            0,
+            row_off,
+            ghsl.width,
+            min(block_rows, ghsl.height - row_off),
+        )
+        rows, _ = window.toslices()
+        out_block = out[rows]
+        pending = ~outside[rows]
+        for year in GHSL_YEARS:
+            data = ghsl.read(get_band(year), window=window)
+            built = pending & (data >= threshold) & (data != NODATA)
+            out_block[built] = year
+            pending &= ~built
+
+    return out, ghsl.transform
 
 
 @dg.graph
 def built_graph(
-    agebs_1990: gpd.GeoDataFrame,
-    agebs_2000: gpd.GeoDataFrame,
-    agebs_2010: gpd.GeoDataFrame,
-    agebs_2020: gpd.GeoDataFrame,
+    footprint: gpd.GeoDataFrame,
+    ghsl: LazyRaster,
 ) -> tuple[np.ndarray, Affine]:
-    bounds = get_total_bounds(agebs_1990, agebs_2000, agebs_2010, agebs_2020)
-
-    rasters, transforms = [], []
-    for year in YEARS:
-        f = load_built_rasters_ops[year]
-        data, transform = f(bounds)
-        rasters.append(data)
-        transforms.append(transform)
-
-    return reduce_rasters(rasters, transforms)
+    return reduce_built_rasters(ghsl, footprint)
 
 
 @dg.graph_asset(
     name="built_zone",
     ins={
-        "agebs_1990": dg.AssetIn(key=["agebs", "1990"]),
-        "agebs_2000": dg.AssetIn(key=["agebs", "2000"]),
-        "agebs_2010": dg.AssetIn(key=["agebs", "2010"]),
-        "agebs_2020": dg.AssetIn(key=["agebs", "2020"]),
+        "footprint": dg.AssetIn(key=["footprint", "zone"]),
+        "ghsl": dg.AssetIn(key=["ghsl", "zone"]),
     },
     partitions_def=zone_partitions,
     group_name="built_rasters_base",
 )
 def built(
-    agebs_1990: gpd.GeoDataFrame,
-    agebs_2000: gpd.GeoDataFrame,
-    agebs_2010: gpd.GeoDataFrame,
-    agebs_2020: gpd.GeoDataFrame,
+    footprint: gpd.GeoDataFrame,
+    ghsl: LazyRaster,
 ) -> tuple[np.ndarray, Affine]:
-    return built_graph(agebs_1990, agebs_2000, agebs_2010, agebs_2020)  # type: ignore[return-value]
+    return built_graph(footprint, ghsl)  # type: ignore[return-value]
 
 
 @dg.graph_asset(
     name="built_mun",
     ins={
-        "agebs_1990": dg.AssetIn(key=["muns", "1990"]),
-        "agebs_2000": dg.AssetIn(key=["muns", "2000"]),
-        "agebs_2010": dg.AssetIn(key=["muns", "2010"]),
-        "agebs_2020": dg.AssetIn(key=["muns", "2020"]),
+        "footprint": dg.AssetIn(key=["footprint", "mun"]),
+        "ghsl": dg.AssetIn(key=["ghsl", "mun"]),
     },
     partitions_def=mun_partitions,
     group_name="built_rasters_mun",
 )
 def built_mun(
-    agebs_1990: gpd.GeoDataFrame,
-    agebs_2000: gpd.GeoDataFrame,
-    agebs_2010: gpd.GeoDataFrame,
-    agebs_2020: gpd.GeoDataFrame,
+    footprint: gpd.GeoDataFrame,
+    ghsl: LazyRaster,
 ) -> tuple[np.ndarray, Affine]:
-    return built_graph(agebs_1990, agebs_2000, agebs_2010, agebs_2020)  # type: ignore[return-value]
+    return built_graph(footprint, ghsl)  # type: ignore[return-value]
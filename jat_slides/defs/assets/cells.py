@@ -1,12 +1,15 @@
+from collections.abc import Iterable
 from pathlib import Path
 
 import geopandas as gpd
 import pandas as pd
+import shapely
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
-from jat_slides.defs.partitions import mun_partitions
+from jat_slides.defs.partitions import get_mun_code, mun_partitions
 from jat_slides.defs.resources import PathResource
+from jat_slides.defs.store import GeoParquetStore
 
 
 @dg.asset(
@@ -14,47 +17,124 @@ from jat_slides.defs.resources import PathResource
     key_prefix="cells",
     partitions_def=zone_partitions,
     io_manager_key="gpkg_manager",
+    metadata={"crs": "EPSG:6372"},
     group_name="cells_zone",
 )
 def cells_base(
     context: dg.AssetExecutionContext,
     path_resource: PathResource,
 ) -> gpd.GeoDataFrame:
-    fpath = (
-        Path(path_resource.pg_path)
-        / "final"
-        / "differences"
-        / "2000_2020"
-        / f"{context.partition_key}.gpkg"
-    )
+    fpath = get_differences_path(path_resource) / f"{context.partition_key}.gpkg"
     return gpd.read_file(fpath)
 
 
+def get_differences_path(path_resource: PathResource) -> Path:
+    return Path(path_resource.pg_path) / "final" / "differences" / "2000_2020"
+
+
+def _to_sql_literal(value: object) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def read_cells(fpath: Path, codes: Iterable) -> gpd.GeoDataFrame:
+    # The filter runs in the driver, so only the requested cells are read
+    # from zones that span several municipalities.
+    values = ", ".join(_to_sql_literal(code) for code in codes)
+    return gpd.read_file(fpath, where=f"codigo IN ({values})")
+
+
+def get_state_membership(
+    ent: str,
+    diff_path: Path,
+    store: GeoParquetStore,
+) -> pd.DataFrame:
+    cells = []
+    for path in sorted(diff_path.glob(f"{ent}.*.gpkg")):
+        df = gpd.read_file(path, columns=["codigo"])
+        cells.append(df.assign(zone=path.stem))
+
+    keys = [key for key in store.index.index if key.startswith(ent)]
+    if not cells or not keys:
+        return pd.DataFrame(columns=["CVE_MUN", "codigo", "zone"])
+
+    cells = gpd.GeoDataFrame(pd.concat(cells, ignore_index=True))
+    agebs = gpd.GeoDataFrame(
+        pd.concat(
+            [store.read(key, columns=[]).assign(CVE_MUN=key) for key in keys],
+            ignore_index=True,
+        ),
+    ).to_crs(cells.crs)
+
+    # A single bulk query over the whole state replaces one sjoin per
+    # municipality.
+    tree = shapely.STRtree(cells["geometry"].to_numpy())
+    ageb_idx, cell_idx = tree.query(
+        agebs["geometry"].to_numpy(),
+        predicate="intersects",
+    )
+
+    return pd.DataFrame(
+        {
+            "CVE_MUN": agebs["CVE_MUN"].to_numpy()[ageb_idx],
+            "codigo": cells["codigo"].to_numpy()[cell_idx],
+            "zone": cells["zone"].to_numpy()[cell_idx],
+        },
+    ).drop_duplicates()
+
+
+@dg.asset(
+    name="membership",
+    key_prefix="cells",
+    ins={"stores": dg.AssetIn(["muns_state", "2020"])},
+    io_manager_key="parquet_manager",
+    metadata={"partition_col": "CVE_MUN"},
+    group_name="cells_mun",
+)
+def cells_membership(
+    path_resource: PathResource,
+    stores: dict[str, GeoParquetStore | None],
+) -> pd.DataFrame:
+    diff_path = get_differences_path(path_resource)
+    return pd.concat(
+        [
+            get_state_membership(ent, diff_path, store)
+            for ent, store in stores.items()
+            if store is not None
+        ],
+        ignore_index=True,
+    )
+
+
 @dg.asset(
     name="mun",
     key_prefix="cells",
-    ins={"agebs": dg.AssetIn(["muns", "2020"])},
+    ins={"membership": dg.AssetIn(["cells", "membership"])},
     partitions_def=mun_partitions,
     io_manager_key="gpkg_manager",
+    metadata={"crs": "EPSG:6372"},
     group_name="cells_mun",
 )
 def cells_mun(
     context: dg.AssetExecutionContext,
     path_resource: PathResource,
-    agebs: gpd.GeoDataFrame,
+    membership: GeoParquetStore,
 ) -> gpd.GeoDataFrame:
-    if len(context.partition_key) == 4:
-        ent = context.partition_key[0].rjust(2, "0")
-    else:
-        ent = context.partition_key[:2]
-
-    diff_path = Path(path_resource.pg_path) / "final" / "differences" / "2000_2020"
-    df = gpd.GeoDataFrame(
-        pd.concat([gpd.read_file(path) for path in diff_path.glob(f"{ent}.*.gpkg")]),
-    )
-
-    joined = df.sjoin(agebs.to_crs("EPSG:6372"), how="inner", predicate="intersects")[
-        "codigo"
-    ].unique()
+    code = get_mun_code(context.partition_key)
+    diff_path = get_differences_path(path_resource)
+    if code not in membership:
+        # Zero rows of any differences file give the same columns as the
+        # non-empty output.
+        fpath = min(diff_path.glob("*.gpkg"), default=None)
+        if fpath is None:
+            err = f"No population grid differences found in {diff_path}"
+            raise FileNotFoundError(err)
+        return gpd.read_file(fpath, max_features=0)
 
-    return df.loc[df["codigo"].isin(joined)]
+    members = membership.read(code)
+    dfs = [
+        read_cells(diff_path / f"{zone}.gpkg", df["codigo"])
+        for zone, df in members.groupby("zone", sort=True)
+    ]
+    return gpd.GeoDataFrame(pd.concat(dfs, ignore_index=True))
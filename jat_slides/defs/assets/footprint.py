@@ -0,0 +1,79 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+from dagster_components.partitions import zone_partitions
+
+import dagster as dg
+from jat_slides.defs.partitions import mun_partitions
+
+
+class FootprintConfig(dg.Config):
+    # Distance in meters to grow the footprint by. 0 keeps it as is.
+    buffer: float = 0.0
+    # Simplification tolerance in meters. 0 keeps every vertex.
+    simplify: float = 0.0
+
+
+def union_coverage(geoms: np.ndarray) -> shapely.Geometry:
+    # AGEBs of a single census year tile the zone without overlaps, which
+    # lets GEOS dissolve them along shared edges instead of overlaying them.
+    if len(geoms) > 0 and shapely.coverage_is_valid(geoms):
+        return shapely.coverage_union_all(geoms)
+    return shapely.union_all(geoms)
+
+
+def get_footprint(*agebs: gpd.GeoDataFrame) -> shapely.Geometry:
+    year_footprints = [union_coverage(df["geometry"].to_numpy()) for df in agebs]
+    return shapely.make_valid(shapely.union_all(year_footprints))
+
+
+def footprint_factory(
+    suffix: str,
+    *,
+    prefix: str,
+    partitions_def: dg.PartitionsDefinition,
+    group_name: str,
+) -> dg.AssetsDefinition:
+    @dg.asset(
+        name=suffix,
+        key_prefix="footprint",
+        ins={
+            "agebs_1990": dg.AssetIn(key=[prefix, "1990"]),
+            "agebs_2000": dg.AssetIn(key=[prefix, "2000"]),
+            "agebs_2010": dg.AssetIn(key=[prefix, "2010"]),
+            "agebs_2020": dg.AssetIn(key=[prefix, "2020"]),
+        },
+        partitions_def=partitions_def,
+        io_manager_key="gpkg_manager",
+        group_name=group_name,
+    )
+    def _asset(
+        config: FootprintConfig,
+        agebs_1990: gpd.GeoDataFrame,
+        agebs_2000: gpd.GeoDataFrame,
+        agebs_2010: gpd.GeoDataFrame,
+        agebs_2020: gpd.GeoDataFrame,
+    ) -> gpd.GeoDataFrame:
+        footprint = get_footprint(agebs_1990, agebs_2000, agebs_2010, agebs_2020)
+        if config.buffer > 0:
+            footprint = footprint.buffer(config.buffer)
+        if config.simplify > 0:
+            footprint = footprint.simplify(config.simplify, preserve_topology=True)
+
+        return gpd.GeoDataFrame(geometry=[footprint], crs=agebs_2020.crs)
+
+    return _asset
+
+
+footprint_zone = footprint_factory(
+    "zone",
+    prefix="agebs",
+    partitions_def=zone_partitions,
+    group_name="built_rasters_base",
+)
+footprint_mun = footprint_factory(
+    "mun",
+    prefix="muns",
+    partitions_def=mun_partitions,
+    group_name="built_rasters_mun",
+)
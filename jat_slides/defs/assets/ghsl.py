@@ -0,0 +1,139 @@
+from contextlib import ExitStack
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import rasterio as rio
+import rasterio.mask as rio_mask
+from affine import Affine
+from dagster_components.partitions import zone_partitions
+
+import dagster as dg
+from jat_slides.defs.partitions import mun_partitions
+from jat_slides.defs.raster import LazyRaster
+from jat_slides.defs.resources import PathResource
+from jat_slides.defs.zonal import rasterize_labels
+
+GHSL_YEARS = range(1975, 2021, 5)
+LABEL_YEARS = (1990, 2000, 2010, 2020)
+NODATA = 65535
+
+
+def get_band(year: int) -> int:
+    return GHSL_YEARS.index(year) + 1
+
+
+def ghsl_factory(
+    suffix: str,
+    *,
+    partitions_def: dg.PartitionsDefinition,
+    group_name: str,
+) -> dg.AssetsDefinition:
+    @dg.asset(
+        name=suffix,
+        key_prefix="ghsl",
+        ins={"footprint": dg.AssetIn(key=["footprint", suffix])},
+        partitions_def=partitions_def,
+        io_manager_key="raster_manager",
+        metadata={"bands": list(GHSL_YEARS)},
+        group_name=group_name,
+    )
+    def _asset(
+        path_resource: PathResource,
+        footprint: gpd.GeoDataFrame,
+    ) -> tuple[np.ndarray, Affine]:
+        built_path = Path(path_resource.ghsl_path) / "BUILT_100"
+
+        with ExitStack() as stack:
+            datasets = [
+                stack.enter_context(rio.open(built_path / f"{year}.tif"))
+                for year in GHSL_YEARS
+            ]
+            for ds in datasets[1:]:
+                if ds.transform != datasets[0].transform:
+                    err = f"{ds.name} is not on the same grid as {datasets[0].name}"
+                    raise ValueError(err)
+
+            # Every epoch is clipped to the same window, so downstream assets
+            # can mask each band with their own geometries.
+            _, transform, window = rio_mask.raster_geometry_mask(
+                datasets[0],
+                footprint["geometry"].tolist(),
+                crop=True,
+            )
+            arr = np.stack([ds.read(1, window=window) for ds in datasets])
+
+        return arr, transform
+
+    return _asset
+
+
+def labels_factory(
+    suffix: str,
+    *,
+    prefix: str,
+    partitions_def: dg.PartitionsDefinition,
+    group_name: str,
+) -> dg.AssetsDefinition:
+    @dg.asset(
+        name=suffix,
+        key_prefix="ghsl_labels",
+        ins={
+            "agebs_1990": dg.AssetIn(key=[prefix, "1990"]),
+            "agebs_2000": dg.AssetIn(key=[prefix, "2000"]),
+            "agebs_2010": dg.AssetIn(key=[prefix, "2010"]),
+            "agebs_2020": dg.AssetIn(key=[prefix, "2020"]),
+            "ghsl": dg.AssetIn(key=["ghsl", suffix], metadata={"lazy": True}),
+        },
+        partitions_def=partitions_def,
+        io_manager_key="raster_manager",
+        metadata={"bands": list(LABEL_YEARS)},
+        group_name=group_name,
+    )
+    def _asset(
+        agebs_1990: gpd.GeoDataFrame,
+        agebs_2000: gpd.GeoDataFrame,
+        agebs_2010: gpd.GeoDataFrame,
+        agebs_2020: gpd.GeoDataFrame,
+        ghsl: LazyRaster,
+    ) -> tuple[np.ndarray, Affine]:
+        # One band per census year, aligned with the GHSL cube. Label i + 1
+        # is the i-th AGEB of that year.
+        arr = np.stack(
+            [
+                rasterize_labels(
+                    agebs["geometry"].to_numpy(),
+                    out_shape=ghsl.shape,
+                    transform=ghsl.transform,
+                )
+                for agebs in (agebs_1990, agebs_2000, agebs_2010, agebs_2020)
+            ],
+        )
+        return arr, ghsl.transform
+
+    return _asset
+
+
+ghsl_zone = ghsl_factory(
+    "zone",
+    partitions_def=zone_partitions,
+    group_name="built_rasters_base",
+)
+ghsl_mun = ghsl_factory(
+    "mun",
+    partitions_def=mun_partitions,
+    group_name="built_rasters_mun",
+)
+
+labels_zone = labels_factory(
+    "zone",
+    prefix="agebs",
+    partitions_def=zone_partitions,
+    group_name="built_rasters_base",
+)
+labels_mun = labels_factory(
+    "mun",
+    prefix="muns",
+    partitions_def=mun_partitions,
+    group_name="built_rasters_mun",
+)
@@ -1,4 +1,5 @@
 import json
+from collections.abc import Iterator
 from pathlib import Path
 
 import geopandas as gpd
@@ -6,69 +7,99 @@ import pandas as pd
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
-from jat_slides.defs.partitions import mun_partitions
+from jat_slides.defs.partitions import get_mun_code, mun_partitions
 from jat_slides.defs.resources import PathResource
+from jat_slides.defs.store import GeoParquetStore
+
+
+def iter_income_parts(
+    segregation_path: Path,
+) -> Iterator[tuple[str, gpd.GeoDataFrame]]:
+    short_to_long_map_path = segregation_path / "short_to_long_map.json"
+    with short_to_long_map_path.open(encoding="utf8") as f:
+        short_to_long_map = json.load(f)
+
+    for path in sorted((segregation_path / "incomes").glob("*.gpkg")):
+        # Metropolitan files are named M{ent}..., after their main state.
+        state = path.stem[1:3] if path.stem.startswith("M") else None
+        df = (
+            gpd.read_file(path)
+            .dropna(subset=["income_pc"])
+            .to_crs("EPSG:4326")
+            .assign(zone=short_to_long_map.get(path.stem), state=state)
+        )
+        yield path.stem, df
+
+
+@dg.asset(
+    name="catalog",
+    key_prefix="income",
+    io_manager_key="parquet_manager",
+    metadata={
+        "partition_col": "short_name",
+        "sort_by": "cvegeo",
+        "index_cols": ["zone", "state"],
+        "range_cols": ["cvegeo"],
+    },
+    dagster_type=dg.Any,
+    group_name="income",
+)
+def income_catalog(
+    path_resource: PathResource,
+) -> dg.Output[Iterator[tuple[str, gpd.GeoDataFrame]]]:
+    return dg.Output(iter_income_parts(Path(path_resource.segregation_path)))
 
 
 @dg.asset(
     name="zone",
     key_prefix="income",
+    ins={"catalog": dg.AssetIn(["income", "catalog"])},
     partitions_def=zone_partitions,
     io_manager_key="gpkg_manager",
+    metadata={"crs": "EPSG:4326"},
     group_name="income",
 )
 def income(
     context: dg.AssetExecutionContext,
-    path_resource: PathResource,
+    catalog: GeoParquetStore,
 ) -> gpd.GeoDataFrame:
-    segregation_path = Path(path_resource.segregation_path)
+    keys = catalog.index.index[catalog.index["zone"] == context.partition_key]
+    if len(keys) > 0:
+        return catalog.read(keys[0])
 
-    short_to_long_map_path = segregation_path / "short_to_long_map.json"
-    with short_to_long_map_path.open(encoding="utf8") as f:
-        long_to_short_map = {value: key for key, value in json.load(f).items()}
-
-    if context.partition_key in long_to_short_map:
-        return (
-            gpd.read_file(
-                segregation_path
-                / "incomes"
-                / f"{long_to_short_map[context.partition_key]}.gpkg",
-            )
-            .dropna(subset=["income_pc"])
-            .to_crs("EPSG:4326")
-        )
-
-    return gpd.GeoDataFrame(geometry=[])
+    return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
 
 
 @dg.asset(
     name="mun",
     key_prefix="income",
+    ins={"catalog": dg.AssetIn(["income", "catalog"])},
     partitions_def=mun_partitions,
     io_manager_key="gpkg_manager",
+    metadata={"crs": "EPSG:4326"},
     group_name="income_mun",
 )
 def load_state_income_df(
     context: dg.OpExecutionContext,
-    path_resource: PathResource,
+    catalog: GeoParquetStore,
 ) -> gpd.GeoDataFrame:
-    if len(context.partition_key) == 4:
-        ent = f"0{context.partition_key[0]}"
-    elif len(context.partition_key) == 5:
-        ent = context.partition_key[:2]
-    else:
-        err = "Invalid partition key length"
-        raise ValueError(err)
-
-    income_path = Path(path_resource.segregation_path) / "incomes"
+    code = get_mun_code(context.partition_key)
 
+    # Parts are sorted by cvegeo, so the filter only touches the row groups
+    # that hold the municipality.
+    index = catalog.index
+    keys = index.index[
+        (index["state"] == code[:2])
+        & (index["min_cvegeo"].str[:5] <= code)
+        & (index["max_cvegeo"].str[:5] >= code)
+    ]
     df = [
-        gpd.read_file(path).dropna(subset=["income_pc"])
-        for path in income_path.glob(f"M{ent}*.gpkg")
+        catalog.read(key, filters=[("cvegeo", ">=", code), ("cvegeo", "<", f"{code}~")])
+        for key in keys
     ]
+    if not df:
+        return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
 
-    return (
-        gpd.GeoDataFrame(pd.concat(df, ignore_index=True))
-        .to_crs("EPSG:4326")
-        .query("cvegeo.str.startswith(@context.partition_key)")
+    return gpd.GeoDataFrame(pd.concat(df, ignore_index=True)).query(
+        "cvegeo.str.startswith(@code)",
     )
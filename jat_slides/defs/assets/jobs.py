@@ -1,35 +1,195 @@
+import tempfile
+from collections.abc import Iterator
 from pathlib import Path
+from typing import NamedTuple
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyproj
+import shapely
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
 from jat_slides.defs.partitions import mun_partitions
 from jat_slides.defs.resources import PathResource
+from jat_slides.defs.store import GeoParquetStore
+
+# Side of the square tiles, in meters of EPSG:6372, used to split the jobs
+# store.
+TILE_SIZE = 50_000
+
+# Bytes of CSV parsed per batch. Together with the size of the largest tile,
+# this bounds the memory used by the ingestion.
+CSV_BLOCK_SIZE = 64 * 1024 * 1024
+
+
+def get_tile_keys(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    ix = np.floor_divide(x, TILE_SIZE).astype(int).astype(str)
+    iy = np.floor_divide(y, TILE_SIZE).astype(int).astype(str)
+    return np.char.add(np.char.add(ix, "_"), iy)
+
+
+def iter_jobs_batches(fpath: Path) -> Iterator[pd.DataFrame]:
+    transformer = pyproj.Transformer.from_crs(
+        "EPSG:4326",
+        "EPSG:6372",
+        always_xy=True,
+    )
+    columns = ["num_empleos_esperados", "longitud", "latitud"]
+    reader = pa_csv.open_csv(
+        fpath,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types=dict.fromkeys(columns, pa.float32()),
+        ),
+    )
+
+    for batch in reader:
+        df = batch.to_pandas()
+        x, y = transformer.transform(
+            df["longitud"].to_numpy(np.float64),
+            df["latitud"].to_numpy(np.float64),
+        )
+        valid = np.isfinite(x) & np.isfinite(y)
+        yield pd.DataFrame(
+            {
+                "num_empleos_esperados": df["num_empleos_esperados"].to_numpy()[valid],
+                "x": x[valid],
+                "y": y[valid],
+            },
+        )
+
+
+def iter_jobs_tiles(
+    fpath: Path,
+    staging_path: Path,
+) -> Iterator[tuple[str, gpd.GeoDataFrame]]:
+    staging_path.mkdir(exist_ok=True, parents=True)
+    with tempfile.TemporaryDirectory(dir=staging_path) as tmp_dir:
+        tmp_path = Path(tmp_dir)
+
+        # Batches are split by tile as they are read, so only one batch is
+        # in memory at a time.
+        for i, df in enumerate(iter_jobs_batches(fpath)):
+            keys = get_tile_keys(df["x"].to_numpy(), df["y"].to_numpy())
+            for key, tile in df.groupby(keys, sort=False):
+                tile_path = tmp_path / key
+                tile_path.mkdir(exist_ok=True)
+                tile.to_parquet(tile_path / f"{i:06d}.parquet", index=False)
+
+        for tile_path in sorted(tmp_path.iterdir()):
+            df = pd.read_parquet(tile_path)
+            yield (
+                tile_path.name,
+                gpd.GeoDataFrame(
+                    df.drop(columns=["x", "y"]),
+                    geometry=gpd.points_from_xy(df["x"], df["y"]),
+                    crs="EPSG:6372",
+                ),
+            )
 
 
 @dg.asset(
     name="geo",
     key_prefix="jobs",
-    io_manager_key="gpkg_manager",
+    io_manager_key="parquet_manager",
+    metadata={"partition_col": "tile"},
+    dagster_type=dg.Any,
     group_name="jobs",
 )
-def jobs_geo(path_resource: PathResource) -> gpd.GeoDataFrame:
+def jobs_geo(
+    path_resource: PathResource,
+) -> dg.Output[Iterator[tuple[str, gpd.GeoDataFrame]]]:
     jobs_path = Path(path_resource.jobs_path) / "denue_2023_estimaciones.csv"
+    staging_path = Path(path_resource.data_path) / "generated" / "jobs"
+    # Wrapped in an Output so dagster hands the iterator to the IO manager
+    # instead of consuming it as a stream of events.
+    return dg.Output(iter_jobs_tiles(jobs_path, staging_path))
 
-    return gpd.GeoDataFrame(
-        (
-            pd.read_csv(
-                jobs_path,
-                usecols=["num_empleos_esperados", "longitud", "latitud"],
-            )
-            .assign(geometry=lambda x: gpd.points_from_xy(x["longitud"], x["latitud"]))
-            .drop(columns=["longitud", "latitud"])
-        ),
-        crs="EPSG:4326",
-        geometry="geometry",
-    ).to_crs("EPSG:6372")
+
+class RegularGrid(NamedTuple):
+    x0: float
+    y0: float
+    cell_width: float
+    cell_height: float
+    # Position of each unit in a (rows, cols) array, -1 where there is none.
+    lookup: np.ndarray
+
+
+def get_regular_grid(units: gpd.GeoDataFrame) -> RegularGrid | None:
+    geoms = units.geometry.to_numpy()
+    if len(geoms) == 0:
+        return None
+    if not (
+        (shapely.get_type_id(geoms) == shapely.GeometryType.POLYGON).all()
+        # Four corners plus the closing point.
+        and (shapely.get_num_coordinates(geoms) == 5).all()
+    ):
+        return None
+
+    minx, miny, maxx, maxy = shapely.bounds(geoms).T
+    widths, heights = maxx - minx, maxy - miny
+    cell_width, cell_height = np.median(widths), np.median(heights)
+
+    # Same-sized, axis-aligned rectangles fill their bounding boxes.
+    if not (
+        np.allclose(widths, cell_width)
+        and np.allclose(heights, cell_height)
+        and np.allclose(shapely.area(geoms), widths * heights)
+    ):
+        return None
+
+    x0, y0 = minx.min(), miny.min()
+    cols = (minx - x0) / cell_width
+    rows = (miny - y0) / cell_height
+    if not (
+        np.allclose(cols, np.round(cols), atol=1e-6)
+        and np.allclose(rows, np.round(rows), atol=1e-6)
+    ):
+        return None
+
+    cols, rows = np.round(cols).astype(int), np.round(rows).astype(int)
+    lookup = np.full((rows.max() + 1, cols.max() + 1), -1, dtype=np.int64)
+    lookup[rows, cols] = np.arange(len(geoms))
+    if (lookup >= 0).sum() != len(geoms):
+        # Overlapping cells.
+        return None
+
+    return RegularGrid(x0, y0, cell_width, cell_height, lookup)
+
+
+def count_jobs_on_grid(
+    units: gpd.GeoDataFrame,
+    jobs: gpd.GeoDataFrame,
+    grid: RegularGrid,
+    *,
+    index_col: str,
+) -> pd.Series:
+    cols = np.floor((jobs.geometry.x.to_numpy() - grid.x0) / grid.cell_width)
+    rows = np.floor((jobs.geometry.y.to_numpy() - grid.y0) / grid.cell_height)
+
+    n_rows, n_cols = grid.lookup.shape
+    inside = (cols >= 0) & (cols < n_cols) & (rows >= 0) & (rows < n_rows)
+    idx = grid.lookup[rows[inside].astype(int), cols[inside].astype(int)]
+    # Missing estimates count as no jobs, as the sum in the sjoin path skips
+    # them.
+    weights = np.nan_to_num(jobs["num_empleos_esperados"].to_numpy()[inside])
+    weights, idx = weights[idx >= 0], idx[idx >= 0]
+
+    totals = np.bincount(idx, weights=weights, minlength=len(units))
+    counts = np.bincount(idx, minlength=len(units))
+    has_jobs = counts > 0
+
+    return (
+        pd.Series(totals[has_jobs], index=units[index_col].to_numpy()[has_jobs])
+        .groupby(level=0)
+        .sum()
+        .rename_axis(index_col)
+    )
 
 
 def jobs_reprojected_factory(
@@ -44,27 +204,34 @@ def jobs_reprojected_factory(
         key_prefix="jobs",
         ins={
             "jobs": dg.AssetIn(["jobs", "geo"]),
-            "units": dg.AssetIn(unit_asset_key),
+            "units": dg.AssetIn(unit_asset_key, metadata={"crs": "EPSG:6372"}),
         },
         partitions_def=partitions_def,
         io_manager_key="gpkg_manager",
+        metadata={"crs": "EPSG:6372"},
         group_name="jobs",
     )
     def _asset(
-        jobs: gpd.GeoDataFrame,
+        jobs: GeoParquetStore,
         units: gpd.GeoDataFrame,
     ) -> gpd.GeoDataFrame:
-        jobs = jobs.to_crs("EPSG:6372")
-        units = units.to_crs("EPSG:6372")
-
-        joined = (
-            units[[index_col, "geometry"]]
-            .sjoin(jobs, how="inner", predicate="contains")
-            .drop(
-                columns=["index_right"],
+        jobs = jobs.read_bbox(
+            tuple(units.total_bounds),
+            columns=["num_empleos_esperados"],
+        ).set_crs("EPSG:6372", allow_override=True)
+
+        grid = get_regular_grid(units)
+        if grid is not None:
+            job_count = count_jobs_on_grid(units, jobs, grid, index_col=index_col)
+        else:
+            joined = (
+                units[[index_col, "geometry"]]
+                .sjoin(jobs, how="inner", predicate="contains")
+                .drop(
+                    columns=["index_right"],
+                )
             )
-        )
-        job_count = joined.groupby(index_col)["num_empleos_esperados"].sum()
+            job_count = joined.groupby(index_col)["num_empleos_esperados"].sum()
 
         return (
             units.set_index(index_col)
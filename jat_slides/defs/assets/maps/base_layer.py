@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import numpy as np
+from dagster_components.partitions import zone_partitions
+
+import dagster as dg
+from jat_slides.defs.assets.maps.basemap import (
+    BASEMAP_PROVIDER,
+    ProviderTileSource,
+    get_basemap_cache,
+)
+from jat_slides.defs.assets.maps.common import (
+    get_bounds_base,
+    get_bounds_mun,
+    get_labels_mun,
+    get_labels_zone,
+    get_overlay_config_mun,
+    get_overlay_config_zone,
+    render_base_layer,
+)
+from jat_slides.defs.partitions import mun_partitions
+from jat_slides.defs.resources import PathResource
+
+
+@dg.op(
+    ins={
+        "mun_boundaries": dg.In(input_manager_key="parquet_path_manager"),
+        "basemap_tiles": dg.In(dg.Nothing),
+    },
+    out=dg.Out(io_manager_key="array_manager"),
+)
+def plot_base_layer(
+    context: dg.OpExecutionContext,
+    path_resource: PathResource,
+    bounds: tuple[float, float, float, float],
+    labels: dict[str, bool],
+    overlay_config: dict | None,
+    mun_boundaries: Path,
+) -> dict[str, np.ndarray]:
+    return render_base_layer(
+        *bounds,
+        # Tiles outside the prefetched bounds are fetched and cached.
+        basemap_cache=get_basemap_cache(
+            path_resource,
+            source=ProviderTileSource(BASEMAP_PROVIDER),
+        ),
+        add_mun_bounds=True,
+        add_mun_labels=labels["mun"],
+        add_state_bounds=False,
+        add_state_labels=labels["state"],
+        state_poly_kwargs={
+            "ls": "--",
+            "linewidth": 1.5,
+            "alpha": 1,
+            "edgecolor": "#006400",
+        },
+        mun_poly_kwargs={"linewidth": 0.3, "alpha": 0.2},
+        state_text_kwargs={"fontsize": 7, "color": "#006400", "alpha": 0.9},
+        mun_boundaries=mun_boundaries,
+        overlay_dir=(
+            Path(path_resource.data_path) / "overlays" / str(context.partition_key)
+        ),
+        overlay_config=overlay_config,
+    )
+
+
+def base_layer_factory(
+    level: str,
+    *,
+    bounds_op: dg.OpDefinition,
+    labels_op: dg.OpDefinition,
+    overlay_config_op: dg.OpDefinition,
+    partitions_def: dg.PartitionsDefinition,
+) -> dg.AssetsDefinition:
+    @dg.graph_asset(
+        name="base_layer",
+        key_prefix=f"plot_{level}",
+        ins={
+            "mun_boundaries": dg.AssetIn(
+                key=["boundaries", "mun"],
+                input_manager_key="parquet_path_manager",
+            ),
+            "basemap_tiles": dg.AssetIn(
+                key=["basemap", "tiles"],
+                dagster_type=dg.Nothing,
+            ),
+        },
+        partitions_def=partitions_def,
+        group_name=f"plot_{level}",
+    )
+    def _asset(mun_boundaries: Path, basemap_tiles: None) -> dict[str, np.ndarray]:
+        bounds = bounds_op()
+        labels = labels_op()
+        overlay_config = overlay_config_op()
+        return plot_base_layer(
+            bounds,
+            labels,
+            overlay_config,
+            mun_boundaries=mun_boundaries,
+            basemap_tiles=basemap_tiles,
+        )
+
+    return _asset
+
+
+base_layer_zone = base_layer_factory(
+    "zone",
+    bounds_op=get_bounds_base,
+    labels_op=get_labels_zone,
+    overlay_config_op=get_overlay_config_zone,
+    partitions_def=zone_partitions,
+)
+
+base_layer_mun = base_layer_factory(
+    "mun",
+    bounds_op=get_bounds_mun,
+    labels_op=get_labels_mun,
+    overlay_config_op=get_overlay_config_mun,
+    partitions_def=mun_partitions,
+)
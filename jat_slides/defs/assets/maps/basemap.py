@@ -0,0 +1,339 @@
+import io
+import math
+import sqlite3
+import urllib.request
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol
+
+import contextily as cx
+import matplotlib.image as mimg
+import numpy as np
+from matplotlib.axes import Axes
+
+import dagster as dg
+from jat_slides.defs.resources import ConfigResource, PathResource
+from jat_slides.defs.store import atomic_path
+
+if TYPE_CHECKING:
+    from xyzservices import TileProvider
+
+BASEMAP_PROVIDER = cx.providers.CartoDB.PositronNoLabels  # ty:ignore[unresolved-attribute]
+BASEMAP_MAX_BYTES = 2 * 1024**3
+# Eviction frees space down to this fraction of the maximum size, so a
+# single scan of the cache makes room for many tiles.
+BASEMAP_LOW_WATER = 0.9
+
+# Half the side of the Web Mercator square, in meters.
+MERCATOR_EXTENT = 20037508.342789244
+MAX_LATITUDE = 85.0511287798066
+
+
+class TileSource(Protocol):
+    def get(self, z: int, x: int, y: int) -> bytes | None: ...
+
+
+class HTTPTileSource:
+    def __init__(self, url: str, *, timeout: float = 30) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    def get(self, z: int, x: int, y: int) -> bytes | None:
+        url = self.url.format(z=z, x=x, y=y)
+        request = urllib.request.Request(  # noqa: S310
+            url,
+            headers={"User-Agent": "jat-slides"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:  # noqa: S310
+            return response.read()
+
+
+class DirectoryTileSource:
+    # An XYZ tree on disk, such as a copy of another cache. It stands in for a
+    # tile server where there is no network.
+    def __init__(self, root: Path, *, extension: str = ".png") -> None:
+        self.root = root
+        self.extension = extension
+
+    def get(self, z: int, x: int, y: int) -> bytes | None:
+        fpath = self.root / str(z) / str(x) / f"{y}{self.extension}"
+        if not fpath.exists():
+            return None
+        return fpath.read_bytes()
+
+
+class MBTilesTileSource:
+    def __init__(self, fpath: Path) -> None:
+        self.fpath = fpath
+
+    def get(self, z: int, x: int, y: int) -> bytes | None:
+        # MBTiles counts rows from the south (TMS).
+        with sqlite3.connect(f"file:{self.fpath}?mode=ro", uri=True) as conn:
+            row = conn.execute(
+                "SELECT tile_data FROM tiles"
+                " WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, (1 << z) - 1 - y),
+            ).fetchone()
+        return None if row is None else bytes(row[0])
+
+
+class ProviderTileSource:
+    # Builds the provider URL on the first fetch, since contextily warns about
+    # API keys every time one is built.
+    def __init__(self, provider: "TileProvider", *, timeout: float = 30) -> None:
+        self.provider = provider
+        self.timeout = timeout
+        self._source: HTTPTileSource | None = None
+
+    def get(self, z: int, x: int, y: int) -> bytes | None:
+        if self._source is None:
+            self._source = HTTPTileSource(
+                self.provider.build_url(),
+                timeout=self.timeout,
+            )
+        return self._source.get(z, x, y)
+
+
+def get_tile_source(spec: str) -> TileSource:
+    if spec.startswith(("http://", "https://")):
+        return HTTPTileSource(spec)
+
+    fpath = Path(spec)
+    if fpath.suffix == ".mbtiles":
+        return MBTilesTileSource(fpath)
+    return DirectoryTileSource(fpath)
+
+
+class TileCache:
+    # Tiles are kept as an XYZ tree. The modification time of a tile is
+    # refreshed when it is read, so eviction drops the least recently used
+    # tiles first.
+    def __init__(
+        self,
+        root: Path,
+        *,
+        source: TileSource | None = None,
+        max_bytes: int = BASEMAP_MAX_BYTES,
+        extension: str = ".png",
+    ) -> None:
+        self.root = root
+        self.source = source
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self._size: int | None = None
+
+    def _get_tile_path(self, z: int, x: int, y: int) -> Path:
+        return self.root / str(z) / str(x) / f"{y}{self.extension}"
+
+    def _iter_tile_paths(self) -> Iterator[Path]:
+        return self.root.glob(f"*/*/*{self.extension}")
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(fpath.stat().st_size for fpath in self._iter_tile_paths())
+        return self._size
+
+    def __contains__(self, tile: tuple[int, int, int]) -> bool:
+        return self._get_tile_path(*tile).exists()
+
+    def get(self, z: int, x: int, y: int) -> bytes:
+        fpath = self._get_tile_path(z, x, y)
+        if fpath.exists():
+            fpath.touch()
+            return fpath.read_bytes()
+
+        data = None if self.source is None else self.source.get(z, x, y)
+        if data is None:
+            err = (
+                f"Tile {z}/{x}/{y} is not in the basemap cache at {self.root}."
+                " Materialize the basemap/tiles asset to prefetch it."
+            )
+            raise KeyError(err)
+
+        self.put(z, x, y, data)
+        return data
+
+    def put(self, z: int, x: int, y: int, data: bytes) -> None:
+        fpath = self._get_tile_path(z, x, y)
+        fpath.parent.mkdir(exist_ok=True, parents=True)
+        with atomic_path(fpath) as tmp_path:
+            tmp_path.write_bytes(data)
+
+        self._size = self.size + len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        stats = [(fpath, fpath.stat()) for fpath in self._iter_tile_paths()]
+        stats.sort(key=lambda item: item[1].st_mtime_ns)
+
+        size = sum(stat.st_size for _, stat in stats)
+        target = int(self.max_bytes * BASEMAP_LOW_WATER)
+        num_evicted = 0
+        for fpath, stat in stats:
+            if size <= target:
+                break
+            fpath.unlink(missing_ok=True)
+            size -= stat.st_size
+            num_evicted += 1
+
+        self._size = size
+        return num_evicted
+
+
+def get_basemap_cache(
+    path_resource: PathResource,
+    *,
+    source: TileSource | None = None,
+    max_bytes: int = BASEMAP_MAX_BYTES,
+) -> TileCache:
+    return TileCache(
+        Path(path_resource.data_path) / "basemap" / BASEMAP_PROVIDER.name,
+        source=source,
+        max_bytes=max_bytes,
+    )
+
+
+def get_zoom(xmin: float, ymin: float, xmax: float, ymax: float) -> int:
+    # Same automatic zoom contextily picks for these bounds.
+    zoom_lon = math.ceil(math.log2(360 * 2.0 / (xmax - xmin)))
+    zoom_lat = math.ceil(math.log2(360 * 2.0 / (ymax - ymin)))
+    return min(zoom_lon, zoom_lat, BASEMAP_PROVIDER.get("max_zoom", 20))
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int) -> tuple[int, int]:
+    n = 1 << z
+    lat = math.radians(min(max(lat, -MAX_LATITUDE), MAX_LATITUDE))
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def get_tiles(
+    xmin: float,
+    ymin: float,
+    xmax: float,
+    ymax: float,
+) -> tuple[int, range, range]:
+    z = get_zoom(xmin, ymin, xmax, ymax)
+    x0, y0 = lonlat_to_tile(xmin, ymax, z)
+    x1, y1 = lonlat_to_tile(xmax, ymin, z)
+    return z, range(x0, x1 + 1), range(y0, y1 + 1)
+
+
+def _decode_tile(data: bytes) -> np.ndarray:
+    img = mimg.imread(io.BytesIO(data))
+    if img.dtype != np.uint8:
+        img = np.round(img * 255).astype(np.uint8)
+    if img.ndim == 2:
+        img = np.repeat(img[..., np.newaxis], 3, axis=2)
+    if img.shape[2] == 3:
+        alpha = np.full((*img.shape[:2], 1), 255, dtype=np.uint8)
+        img = np.concatenate([img, alpha], axis=2)
+    return img
+
+
+def get_basemap_image(
+    xmin: float,
+    ymin: float,
+    xmax: float,
+    ymax: float,
+    *,
+    cache: TileCache,
+) -> tuple[np.ndarray, tuple[float, float, float, float]]:
+    z, xs, ys = get_tiles(xmin, ymin, xmax, ymax)
+    rows = [
+        np.concatenate([_decode_tile(cache.get(z, x, y)) for x in xs], axis=1)
+        for y in ys
+    ]
+    img = np.concatenate(rows, axis=0)
+
+    tile_size = 2 * MERCATOR_EXTENT / (1 << z)
+    extent = (
+        -MERCATOR_EXTENT + xs.start * tile_size,
+        -MERCATOR_EXTENT + xs.stop * tile_size,
+        MERCATOR_EXTENT - ys.stop * tile_size,
+        MERCATOR_EXTENT - ys.start * tile_size,
+    )
+    return cx.warp_tiles(img, extent, t_crs="EPSG:4326")
+
+
+def add_basemap(ax: Axes, *, cache: TileCache) -> None:
+    # Offline replacement for cx.add_basemap on axes in EPSG:4326. The tiles
+    # come from the cache only, so the axes limits must be set beforehand.
+    xmin, xmax, ymin, ymax = ax.axis()
+    img, extent = get_basemap_image(xmin, ymin, xmax, ymax, cache=cache)
+    ax.imshow(img, extent=extent, interpolation="bilinear")
+    ax.axis((xmin, xmax, ymin, ymax))
+
+
+def prefetch_tiles(
+    bounds: Sequence[tuple[float, float, float, float]],
+    *,
+    cache: TileCache,
+) -> dict[str, int]:
+    num_cached = num_fetched = 0
+    for xmin, ymin, xmax, ymax in bounds:
+        z, xs, ys = get_tiles(xmin, ymin, xmax, ymax)
+        for x in xs:
+            for y in ys:
+                if (z, x, y) in cache:
+                    num_cached += 1
+                else:
+                    cache.get(z, x, y)
+                    num_fetched += 1
+
+    # A cache smaller than the configured bounds need evicts earlier tiles.
+    num_missing = 0
+    for xmin, ymin, xmax, ymax in bounds:
+        z, xs, ys = get_tiles(xmin, ymin, xmax, ymax)
+        num_missing += sum((z, x, y) not in cache for x in xs for y in ys)
+
+    return {
+        "num_cached": num_cached,
+        "num_fetched": num_fetched,
+        "num_missing": num_missing,
+    }
+
+
+class BasemapConfig(dg.Config):
+    # Tile URL template, XYZ directory or MBTiles file to seed the cache from.
+    # Defaults to the provider's tile server.
+    source: str | None = None
+    max_bytes: int = BASEMAP_MAX_BYTES
+
+
+@dg.asset(name="tiles", key_prefix="basemap", group_name="basemap")
+def basemap_tiles(
+    context: dg.AssetExecutionContext,
+    config: BasemapConfig,
+    path_resource: PathResource,
+    zone_config_resource: ConfigResource,
+    mun_config_resource: ConfigResource,
+) -> dg.MaterializeResult:
+    # Seeds the tile cache the maps read from for every configured bounds.
+    bounds = [
+        tuple(value)
+        for config_resource in (zone_config_resource, mun_config_resource)
+        for value in config_resource.bounds.values()
+    ]
+    cache = get_basemap_cache(
+        path_resource,
+        source=(
+            ProviderTileSource(BASEMAP_PROVIDER)
+            if config.source is None
+            else get_tile_source(config.source)
+        ),
+        max_bytes=config.max_bytes,
+    )
+    stats = prefetch_tiles(bounds, cache=cache)
+
+    if stats["num_missing"] > 0:
+        context.log.warning(
+            "%d tiles were evicted, raise max_bytes to keep every bounds cached",
+            stats["num_missing"],
+        )
+    return dg.MaterializeResult(
+        metadata={**stats, "num_bounds": len(bounds), "size": cache.size},
+    )
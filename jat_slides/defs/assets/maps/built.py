@@ -1,11 +1,8 @@
-from pathlib import Path
-
 import matplotlib as mpl
 import numpy as np
 import rasterio.plot as rio_plot
 from affine import Affine
 from dagster_components.partitions import zone_partitions
-from dagster_components.resources import PostGISResource
 from matplotlib.axes import Axes
 from matplotlib.colors import Colormap
 from matplotlib.figure import Figure
@@ -13,19 +10,17 @@ from matplotlib.patches import Patch
 
 import dagster as dg
 from jat_slides.defs.assets.maps.common import (
-    add_overlay,
     generate_figure,
     get_bounds_base,
     get_bounds_mun,
-    get_labels_mun,
-    get_labels_zone,
     get_legend_pos_base,
     get_legend_pos_mun,
-    get_overlay_config_mun,
-    get_overlay_config_zone,
 )
+from jat_slides.defs.assets.maps.lod import DPI, FIGSIZE
 from jat_slides.defs.partitions import mun_partitions
-from jat_slides.defs.resources import PathResource
+
+# Width in pixels of a saved figure; finer rasters are never visible.
+RASTER_MAX_SIZE = int(FIGSIZE[0] * DPI)
 
 
 def add_built_legend(cmap: Colormap, *, ax: Axes, loc: str | None) -> None:
@@ -49,36 +44,21 @@ def add_built_legend(cmap: Colormap, *, ax: Axes, loc: str | None) -> None:
 
 
 @dg.op(
-    ins={"data_and_transform": dg.In(input_manager_key="reprojected_raster_manager")},
+    ins={
+        "data_and_transform": dg.In(
+            input_manager_key="reprojected_raster_manager",
+            metadata={"max_size": RASTER_MAX_SIZE},
+        ),
+    },
     out=dg.Out(io_manager_key="plot_manager"),
 )
 def plot_raster(
-    context: dg.OpExecutionContext,
-    path_resource: PathResource,
-    postgis_resource: PostGISResource,
     bounds: tuple[float, float, float, float],
     data_and_transform: tuple[np.ndarray, Affine],
-    labels: dict[str, bool],
     legend_pos: str,
-    overlay_config: dict | None,
+    base_layer: dict[str, np.ndarray],
 ) -> Figure:
-    fig, ax = generate_figure(
-        *bounds,
-        add_mun_bounds=True,
-        add_mun_labels=labels["mun"],
-        add_state_bounds=False,
-        add_state_labels=labels["state"],
-        state_poly_kwargs={
-            "ls": "--",
-            "linewidth": 1.5,
-            "alpha": 1,
-            "edgecolor": "#006400",
-        },
-        mun_poly_kwargs={"linewidth": 0.3, "alpha": 0.2},
-        state_text_kwargs={"fontsize": 7, "color": "#006400", "alpha": 0.9},
-        population_grids_path=path_resource.pg_path,
-        postgis_resource=postgis_resource,
-    )
+    fig, ax = generate_figure(*bounds, base_layer=base_layer)
 
     data, transform = data_and_transform
 
@@ -86,13 +66,15 @@ def plot_raster(
     data[data == 0] = np.nan
 
     cmap = mpl.colormaps["magma_r"].resampled(10)
-    rio_plot.show(data, transform=transform, ax=ax, cmap=cmap)
-    add_built_legend(cmap, ax=ax, loc=legend_pos)
-
-    overlay_dir = (
-        Path(path_resource.data_path) / "overlays" / str(context.partition_key)
+    # Keep the aspect of the base layer so it is not resampled.
+    rio_plot.show(
+        data,
+        transform=transform,
+        ax=ax,
+        cmap=cmap,
+        aspect=ax.get_aspect(),
     )
-    add_overlay(overlay_dir, ax=ax, config=overlay_config)
+    add_built_legend(cmap, ax=ax, loc=legend_pos)
 
     return fig
 
@@ -101,9 +83,7 @@ def built_plot_factory(
     level: str,
     *,
     bounds_op: dg.OpDefinition,
-    labels_op: dg.OpDefinition,
     legend_pos_op: dg.OpDefinition,
-    overlay_config_op: dg.OpDefinition,
     partitions_def: dg.PartitionsDefinition,
 ) -> dg.AssetsDefinition:
     @dg.graph_asset(
@@ -114,21 +94,22 @@ def built_plot_factory(
                 key=f"built_{level}",
                 input_manager_key="reprojected_raster_manager",
             ),
+            "base_layer": dg.AssetIn(key=[f"plot_{level}", "base_layer"]),
         },
         partitions_def=partitions_def,
         group_name=f"plot_{level}",
     )
-    def _asset(data_and_transform: tuple[np.ndarray, Affine]) -> Figure:
+    def _asset(
+        data_and_transform: tuple[np.ndarray, Affine],
+        base_layer: dict[str, np.ndarray],
+    ) -> Figure:
         bounds = bounds_op()
-        labels = labels_op()
         legend_pos = legend_pos_op()
-        overlay_config = overlay_config_op()
         return plot_raster(
             bounds,
             data_and_transform,
-            labels=labels,
             legend_pos=legend_pos,
-            overlay_config=overlay_config,
+            base_layer=base_layer,
         )
 
     return _asset
@@ -137,17 +118,13 @@ def built_plot_factory(
 built_plot_zone = built_plot_factory(
     "zone",
     bounds_op=get_bounds_base,
-    labels_op=get_labels_zone,
     legend_pos_op=get_legend_pos_base,
-    overlay_config_op=get_overlay_config_zone,
     partitions_def=zone_partitions,
 )
 
 built_plot_mun = built_plot_factory(
     "mun",
     bounds_op=get_bounds_mun,
-    labels_op=get_labels_mun,
     legend_pos_op=get_legend_pos_mun,
-    overlay_config_op=get_overlay_config_mun,
     partitions_def=mun_partitions,
 )
@@ -0,0 +1,186 @@
+import itertools
+from collections.abc import Iterator, Sequence
+
+import geopandas as gpd
+import matplotlib.colors as mcol
+import numpy as np
+import rasterio.features as rio_features
+import rasterio.transform as rio_transform
+import shapely
+from matplotlib.axes import Axes
+from matplotlib.patches import Patch
+
+from jat_slides.defs.assets.maps.lod import DPI
+
+# Below this many polygons matplotlib draws the paths faster than they can be
+# rasterized.
+RASTERIZE_MIN_POLYGONS = 5_000
+
+
+def should_rasterize(df: gpd.GeoDataFrame) -> bool:
+    return len(df) >= RASTERIZE_MIN_POLYGONS
+
+
+def get_class_colors(cmap: mcol.Colormap, n_classes: int) -> np.ndarray:
+    # Same colors GeoDataFrame.plot gives each class of a categorical plot.
+    if cmap.N < 32:
+        return cmap(np.arange(n_classes))
+    if n_classes == 1:
+        return cmap(np.array([0.0]))
+    return cmap(np.arange(n_classes) / (n_classes - 1))
+
+
+def get_axes_shape(ax: Axes, *, dpi: float = DPI) -> tuple[int, int]:
+    # Size in pixels of the axes once saved, after fitting the aspect.
+    ax.apply_aspect()
+    position = ax.get_position()
+    width, height = ax.get_figure().get_size_inches()  # ty:ignore[possibly-missing-attribute]
+    return round(position.height * height * dpi), round(position.width * width * dpi)
+
+
+def _get_edges(labels: np.ndarray, width: int) -> np.ndarray:
+    # A pixel is on an edge when its label differs from the previous pixel in
+    # either direction, which gives one pixel wide lines.
+    edges = np.zeros(labels.shape, dtype=bool)
+    edges[1:] |= labels[1:] != labels[:-1]
+    edges[:, 1:] |= labels[:, 1:] != labels[:, :-1]
+
+    for _ in range(width - 1):
+        grown = edges.copy()
+        grown[1:] |= edges[:-1]
+        grown[:, 1:] |= edges[:, :-1]
+        edges = grown
+    return edges
+
+
+def _get_polygonal(geoms: np.ndarray) -> np.ndarray:
+    # make_valid can return collections with stray lines or points next to the
+    # polygons. Only the polygons have an area to fill, and the ragged arrays
+    # cannot hold collections.
+    geoms = np.asarray(geoms, dtype=object)
+    type_ids = shapely.get_type_id(geoms)
+    is_collection = type_ids == shapely.GeometryType.GEOMETRYCOLLECTION
+    if not is_collection.any():
+        return geoms
+
+    geoms = geoms.copy()
+    for i in np.flatnonzero(is_collection):
+        parts = shapely.get_parts(shapely.get_parts(geoms[i]))
+        polygons = parts[shapely.get_type_id(parts) == shapely.GeometryType.POLYGON]
+        geoms[i] = shapely.multipolygons(polygons)
+    return geoms
+
+
+def _iter_geojson(geoms: Sequence) -> Iterator[dict]:
+    # Builds the GeoJSON mappings from the flat coordinate arrays, which is
+    # much faster than going through __geo_interface__ one polygon at a time.
+    geom_type, coords, offsets = shapely.to_ragged_array(_get_polygonal(geoms))
+    if geom_type == shapely.GeometryType.POLYGON:
+        ring_offsets, part_offsets = offsets
+        geom_offsets = np.arange(len(part_offsets))
+    else:
+        ring_offsets, part_offsets, geom_offsets = offsets
+
+    coords = coords.tolist()
+    ring_offsets = ring_offsets.tolist()
+    part_offsets = part_offsets.tolist()
+    geom_offsets = geom_offsets.tolist()
+    for start, end in itertools.pairwise(geom_offsets):
+        yield {
+            "type": "MultiPolygon",
+            "coordinates": [
+                [
+                    coords[ring_offsets[ring] : ring_offsets[ring + 1]]
+                    for ring in range(part_offsets[part], part_offsets[part + 1])
+                ]
+                for part in range(start, end)
+            ],
+        }
+
+
+def rasterize_polygons(
+    geoms: Sequence,
+    colors: np.ndarray,
+    *,
+    bounds: tuple[float, float, float, float],
+    out_shape: tuple[int, int],
+    edgecolor: str = "k",
+    linewidth: float = 0,
+    dpi: float = DPI,
+) -> np.ndarray:
+    # Polygon i gets label i + 1, leaving 0 for the background. Metro grids
+    # can have more polygons than fit in 16 bits.
+    transform = rio_transform.from_bounds(*bounds, out_shape[1], out_shape[0])
+    labels = rio_features.rasterize(
+        zip(_iter_geojson(geoms), range(1, len(geoms) + 1), strict=True),
+        out_shape=out_shape,
+        transform=transform,
+        fill=0,
+        dtype=np.uint32,
+    )
+
+    palette = np.zeros((len(colors) + 1, 4))
+    palette[1:] = colors
+    image = palette[labels]
+
+    # Strokes thinner than a pixel are drawn as a faint one pixel line, as
+    # antialiasing would.
+    linewidth_px = linewidth * dpi / 72
+    if linewidth_px > 0:
+        edges = _get_edges(labels, max(1, round(linewidth_px)))
+        alpha = min(1.0, linewidth_px)
+        edge_rgba = np.array(mcol.to_rgba(edgecolor))
+
+        under = image[edges]
+        image[edges, :3] = edge_rgba[:3] * alpha + under[:, :3] * (1 - alpha)
+        image[edges, 3] = alpha + under[:, 3] * (1 - alpha)
+
+    return image
+
+
+def plot_rasterized(
+    df: gpd.GeoDataFrame,
+    colors: np.ndarray,
+    *,
+    ax: Axes,
+    bounds: tuple[float, float, float, float],
+    edgecolor: str = "k",
+    linewidth: float = 0,
+) -> None:
+    # Draws the polygons as a single image at the saved resolution instead of
+    # one path per polygon.
+    image = rasterize_polygons(
+        df["geometry"].to_numpy(),
+        colors,
+        bounds=bounds,
+        out_shape=get_axes_shape(ax),
+        edgecolor=edgecolor,
+        linewidth=linewidth,
+    )
+
+    xmin, ymin, xmax, ymax = bounds
+    ax.imshow(
+        image,
+        extent=(xmin, xmax, ymin, ymax),
+        aspect=ax.get_aspect(),
+        interpolation="none",
+        zorder=1,
+    )
+    ax.axis((xmin, xmax, ymin, ymax))
+
+
+def add_class_legend(
+    colors: np.ndarray,
+    labels: Sequence[str],
+    *,
+    ax: Axes,
+    edgecolor: str = "k",
+    linewidth: float = 0,
+    **legend_kwds,  # noqa: ANN003
+) -> None:
+    # Legend matching the one GeoDataFrame.plot builds for categorical plots.
+    handles = [
+        Patch(facecolor=color, edgecolor=edgecolor, linewidth=linewidth)
+        for color in colors
+    ]
+    ax.legend(handles=handles, labels=list(labels), **legend_kwds)
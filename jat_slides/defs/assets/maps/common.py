@@ -2,21 +2,21 @@ import itertools
 import os
 from collections.abc import Sequence
 from pathlib import Path
-from typing import Literal
 
-import contextily as cx
 import geopandas as gpd
 import matplotlib.colors as mcol
 import matplotlib.patheffects as mpe
 import matplotlib.pyplot as plt
 import numpy as np
 import shapely
-from dagster_components.resources import PostGISResource
 from matplotlib.axes import Axes
 from matplotlib.figure import Figure
 from matplotlib.patches import Patch
 
 import dagster as dg
+from jat_slides.defs.assets.boundaries import load_boundary_layer
+from jat_slides.defs.assets.maps.basemap import TileCache, add_basemap
+from jat_slides.defs.assets.maps.lod import DPI, FIGSIZE, simplify_for_figure
 from jat_slides.defs.resources import (
     ConfigResource,
 )
@@ -82,14 +82,13 @@ def process_default_args(default_args: dict, kwargs: dict | None) -> dict:
 
 def add_polygon_bounds(
     *,
-    level: Literal["ent", "mun"],
+    boundaries: os.PathLike | str,
     xmin: float,
     ymin: float,
     xmax: float,
     ymax: float,
     ax: Axes,
     add_labels: bool,
-    postgis_resource: PostGISResource,
     poly_kwargs: dict | None = None,
     text_kwargs: dict | None = None,
 ) -> None:
@@ -111,41 +110,10 @@ def add_polygon_bounds(
     poly_kwargs = process_default_args(default_poly_kwargs, poly_kwargs)
     text_kwargs = process_default_args(default_text_kwargs, text_kwargs)
 
-    if level == "ent":
-        name_col = "NOM_ENT"
-    elif level == "mun":
-        name_col = "NOM_MUN"
-
-    with postgis_resource.connect() as conn:
-        df_mun = (
-            gpd.read_postgis(
-                f"""
-            SELECT
-                census_2020_{level}."CVEGEO",
-                census_2020_{level}.geometry,
-                census_2020_{level}."{name_col}"
-            FROM census_2020_{level}
-            WHERE ST_Intersects(
-                census_2020_{level}.geometry,
-                ST_Transform(
-                    ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 4326),
-                    6372
-                )
-            )
-            """,  # noqa: S608
-                conn,
-                params={
-                    "xmin": xmin,
-                    "ymin": ymin,
-                    "xmax": xmax,
-                    "ymax": ymax,
-                },
-                geom_col="geometry",
-            )
-            .to_crs("EPSG:4326")
-            .set_index("CVEGEO")
-            .rename(columns={name_col: "name"})
-        )
+    df_mun = simplify_for_figure(
+        load_boundary_layer(boundaries).query(xmin, ymin, xmax, ymax),
+        (xmin, ymin, xmax, ymax),
+    ).set_index("CVEGEO")
 
     df_mun.plot(
         ax=ax,
@@ -153,18 +121,20 @@ def add_polygon_bounds(
     )
 
     if add_labels:
-        if level is None:
-            err = "level must be 'ent' or 'mun' if add_labels is True"
-            raise ValueError(err)
-
         bbox = shapely.box(xmin, ymin, xmax, ymax)
+        rep_points = shapely.points(df_mun["rep_x"], df_mun["rep_y"])
+
+        # The stored representative point is reused unless it falls outside
+        # the figure, in which case one is computed for the visible part.
         df_mun_trimmed = df_mun.assign(
-            geometry=lambda df: df["geometry"].intersection(bbox),
-            coords=lambda df: df["geometry"].apply(
-                lambda x: x.representative_point().coords[:],
-            ),
+            coords=lambda df: [
+                point.coords[0]
+                if bbox.contains(point)
+                else geom.intersection(bbox).representative_point().coords[0]
+                for point, geom in zip(rep_points, df["geometry"], strict=True)
+            ],
             name=lambda df: df["name"].replace({"México": "Estado de México"}),
-        ).assign(coords=lambda df: df["coords"].apply(lambda x: x[0]))
+        )
 
         for _, row in df_mun_trimmed.iterrows():
             text = row["name"]
@@ -185,24 +155,13 @@ def add_polygon_bounds(
             )
 
 
-def generate_figure(
+def create_figure(
     xmin: float,
     ymin: float,
     xmax: float,
     ymax: float,
-    *,
-    postgis_resource: PostGISResource,
-    add_mun_bounds: bool = False,
-    add_mun_labels: bool = False,
-    add_state_bounds: bool = False,
-    add_state_labels: bool = False,
-    state_poly_kwargs: dict | None = None,
-    state_text_kwargs: dict | None = None,
-    mun_poly_kwargs: dict | None = None,
-    mun_text_kwargs: dict | None = None,
-    population_grids_path: os.PathLike | str | None = None,
 ) -> tuple[Figure, Axes]:
-    fig, ax = plt.subplots(figsize=(8, 4.5))
+    fig, ax = plt.subplots(figsize=FIGSIZE)
     ax.axis("off")
 
     ax.set_xlim(xmin, xmax)
@@ -213,15 +172,55 @@ def generate_figure(
     fig.subplots_adjust(right=1)
     fig.subplots_adjust(left=0)
 
-    cx.add_basemap(ax, source=cx.providers.CartoDB.PositronNoLabels, crs="EPSG:4326")  # ty:ignore[unresolved-attribute]
+    return fig, ax
+
+
+def _capture_axes(fig: Figure, ax: Axes) -> np.ndarray:
+    fig.canvas.draw()
+    buffer = np.asarray(fig.canvas.buffer_rgba())  # ty:ignore[unresolved-attribute]
+
+    # Display coordinates start at the bottom, image rows at the top.
+    x0, y0, x1, y1 = np.round(ax.get_window_extent().extents).astype(int)
+    height = buffer.shape[0]
+    return buffer[height - y1 : height - y0, x0:x1].copy()
+
+
+def render_base_layer(
+    xmin: float,
+    ymin: float,
+    xmax: float,
+    ymax: float,
+    *,
+    basemap_cache: TileCache,
+    add_mun_bounds: bool = False,
+    add_mun_labels: bool = False,
+    add_state_bounds: bool = False,
+    add_state_labels: bool = False,
+    state_poly_kwargs: dict | None = None,
+    state_text_kwargs: dict | None = None,
+    mun_poly_kwargs: dict | None = None,
+    mun_text_kwargs: dict | None = None,
+    mun_boundaries: os.PathLike | str | None = None,
+    state_boundaries: os.PathLike | str | None = None,
+    overlay_dir: Path | None = None,
+    overlay_config: dict | None = None,
+) -> dict[str, np.ndarray]:
+    # The layers shared by every map of a partition are rendered to RGBA
+    # arrays covering the axes at the saved resolution. "under" holds the
+    # basemap and "over" everything drawn above the data.
+    fig, ax = create_figure(xmin, ymin, xmax, ymax)
+    fig.set_dpi(DPI)
+
+    add_basemap(ax, cache=basemap_cache)
+    basemap_images = ax.get_images()
 
     if add_mun_bounds:
-        if population_grids_path is None:
-            err = "population_grids_path must be provided if add_mun_bounds is True"
+        if mun_boundaries is None:
+            err = "mun_boundaries must be provided if add_mun_bounds is True"
             raise ValueError(err)
 
-        population_grids_path = Path(population_grids_path)
         add_polygon_bounds(
+            boundaries=mun_boundaries,
             xmin=xmin,
             ymin=ymin,
             xmax=xmax,
@@ -230,18 +229,15 @@ def generate_figure(
             add_labels=add_mun_labels,
             poly_kwargs=mun_poly_kwargs,
             text_kwargs=mun_text_kwargs,
-            level="mun",
-            postgis_resource=postgis_resource,
         )
 
     if add_state_bounds:
-        if population_grids_path is None:
-            err = "population_grids_path must be provided if add_state_bounds is True"
+        if state_boundaries is None:
+            err = "state_boundaries must be provided if add_state_bounds is True"
             raise ValueError(err)
 
-        population_grids_path = Path(population_grids_path)
-
         add_polygon_bounds(
+            boundaries=state_boundaries,
             xmin=xmin,
             ymin=ymin,
             xmax=xmax,
@@ -250,10 +246,58 @@ def generate_figure(
             add_labels=add_state_labels,
             poly_kwargs=state_poly_kwargs,
             text_kwargs=state_text_kwargs,
-            level="ent",
-            postgis_resource=postgis_resource,
         )
 
+    if overlay_dir is not None:
+        add_overlay(overlay_dir, ax=ax, config=overlay_config)
+
+    # Both layers are captured once everything is drawn, since plotting the
+    # boundaries changes the aspect and with it the size of the axes.
+    over_artists = [
+        artist for artist in ax.get_children() if artist not in basemap_images
+    ]
+
+    fig.patch.set_alpha(0)
+    for image in basemap_images:
+        image.set_visible(False)
+    over = _capture_axes(fig, ax)
+
+    fig.patch.set_alpha(1)
+    for image in basemap_images:
+        image.set_visible(True)
+    for artist in over_artists:
+        artist.set_visible(False)
+    under = _capture_axes(fig, ax)
+
+    aspect = ax.get_aspect()
+    plt.close(fig)
+    return {
+        "under": under,
+        "over": over,
+        "aspect": np.array(np.nan if aspect == "auto" else aspect),
+    }
+
+
+def generate_figure(
+    xmin: float,
+    ymin: float,
+    xmax: float,
+    ymax: float,
+    *,
+    base_layer: dict[str, np.ndarray],
+) -> tuple[Figure, Axes]:
+    fig, ax = create_figure(xmin, ymin, xmax, ymax)
+
+    aspect = float(base_layer["aspect"])
+    image_kwargs = {
+        "extent": (xmin, xmax, ymin, ymax),
+        "aspect": "auto" if np.isnan(aspect) else aspect,
+        "interpolation": "none",
+    }
+    ax.imshow(base_layer["under"], zorder=0, **image_kwargs)
+    ax.imshow(base_layer["over"], zorder=999, **image_kwargs)
+    ax.axis((xmin, xmax, ymin, ymax))
+
     return fig, ax
 
 
@@ -1,79 +1,84 @@
-from pathlib import Path
-
 import geopandas as gpd
+import mapclassify
 import matplotlib as mpl
+import numpy as np
 from dagster_components.partitions import zone_partitions
-from dagster_components.resources import PostGISResource
 from matplotlib.figure import Figure
 
 import dagster as dg
+from jat_slides.defs.assets.maps.choropleth import (
+    add_class_legend,
+    get_class_colors,
+    plot_rasterized,
+    should_rasterize,
+)
 from jat_slides.defs.assets.maps.common import (
-    add_overlay,
     generate_figure,
     get_bounds_base,
     get_bounds_mun,
-    get_labels_mun,
-    get_labels_zone,
     get_legend_pos_base,
     get_legend_pos_mun,
     get_linewidth,
-    get_overlay_config_mun,
-    get_overlay_config_zone,
     update_categorical_legend,
 )
+from jat_slides.defs.assets.maps.lod import simplify_for_figure
 from jat_slides.defs.partitions import mun_partitions
-from jat_slides.defs.resources import (
-    PathResource,
-)
 
 
 @dg.op(out=dg.Out(io_manager_key="plot_manager"))
 def plot_income(
-    context: dg.OpExecutionContext,
-    path_resource: PathResource,
-    postgis_resource: PostGISResource,
     df: gpd.GeoDataFrame,
     bounds: tuple[float, float, float, float],
     lw: float,
-    labels: dict[str, bool],
     legend_pos: str,
-    overlay_config: dict | None,
+    base_layer: dict[str, np.ndarray],
 ) -> Figure:
     cmap = mpl.colormaps["RdBu"]
 
-    fig, ax = generate_figure(
-        *bounds,
-        add_mun_bounds=True,
-        add_mun_labels=labels["mun"],
-        add_state_bounds=False,
-        add_state_labels=labels["state"],
-        state_poly_kwargs={
-            "ls": "--",
-            "linewidth": 1.5,
-            "alpha": 1,
-            "edgecolor": "#006400",
-        },
-        mun_poly_kwargs={"linewidth": 0.3, "alpha": 0.2},
-        state_text_kwargs={"fontsize": 7, "color": "#006400", "alpha": 0.9},
-        population_grids_path=path_resource.pg_path,
-        postgis_resource=postgis_resource,
-    )
+    fig, ax = generate_figure(*bounds, base_layer=base_layer)
 
     if len(df) == 0:
         return fig
 
-    df.plot(
-        column="income_pc",
-        scheme="natural_breaks",
-        k=6,
-        cmap=cmap,
-        legend=True,
-        ax=ax,
-        edgecolor="k",  # ty:ignore[invalid-argument-type]
-        lw=lw,
-        autolim=False,
-        aspect=None,
-    )
+    if should_rasterize(df):
+        values = df["income_pc"].to_numpy()
+        valid = ~np.isnan(values)
+
+        # Missing values are left out, as GeoDataFrame.plot does.
+        binning = mapclassify.classify(values[valid], "natural_breaks", k=6)
+        colors = get_class_colors(cmap, len(binning.bins))
+        face_colors = np.zeros((len(df), 4))
+        face_colors[valid] = colors[binning.find_bin(values[valid])]
+
+        plot_rasterized(
+            df,
+            face_colors,
+            ax=ax,
+            bounds=bounds,
+            edgecolor="k",
+            linewidth=lw,
+        )
+        add_class_legend(
+            colors,
+            [label[1:-1] for label in binning.get_legend_classes(fmt="{:.2f}")],
+            ax=ax,
+            edgecolor="k",
+            linewidth=lw,
+        )
+    else:
+        df = simplify_for_figure(df, bounds)
+        df.plot(
+            column="income_pc",
+            scheme="natural_breaks",
+            k=6,
+            cmap=cmap,
+            legend=True,
+            ax=ax,
+            edgecolor="k",  # ty:ignore[invalid-argument-type]
+            lw=lw,
+            autolim=False,
+            aspect=None,
+        )
 
     update_categorical_legend(
         ax,
@@ -83,11 +88,6 @@ def plot_income(
         legend_pos=legend_pos,
     )
 
-    overlay_dir = (
-        Path(path_resource.data_path) / "overlays" / str(context.partition_key)
-    )
-    add_overlay(overlay_dir, ax=ax, config=overlay_config)
-
     return fig
 
 
@@ -95,31 +95,32 @@ def income_plot_factory(
     level: str,
     *,
     bounds_op: dg.OpDefinition,
-    labels_op: dg.OpDefinition,
     legend_pos_op: dg.OpDefinition,
-    overlay_config_op: dg.OpDefinition,
     partitions_def: dg.PartitionsDefinition,
 ) -> dg.AssetsDefinition:
     @dg.graph_asset(
         name="income",
         key_prefix=f"plot_{level}",
-        ins={"df": dg.AssetIn(key=["income", level])},
+        ins={
+            "df": dg.AssetIn(key=["income", level]),
+            "base_layer": dg.AssetIn(key=[f"plot_{level}", "base_layer"]),
+        },
         partitions_def=partitions_def,
         group_name=f"plot_{level}",
     )
-    def _asset(df: gpd.GeoDataFrame) -> Figure:
+    def _asset(
+        df: gpd.GeoDataFrame,
+        base_layer: dict[str, np.ndarray],
+    ) -> Figure:
         lw = get_linewidth()
         bounds = bounds_op()
-        labels = labels_op()
         legend_pos = legend_pos_op()
-        overlay_config = overlay_config_op()
         return plot_income(
             df,
             bounds,
             lw,
-            labels,
             legend_pos,
-            overlay_config=overlay_config,
+            base_layer=base_layer,
         )
 
     return _asset
@@ -128,17 +129,13 @@ def income_plot_factory(
 income_plot_zone = income_plot_factory(
     "zone",
     bounds_op=get_bounds_base,
-    labels_op=get_labels_zone,
     legend_pos_op=get_legend_pos_base,
-    overlay_config_op=get_overlay_config_zone,
     partitions_def=zone_partitions,
 )
 
 income_plot_mun = income_plot_factory(
     "mun",
     bounds_op=get_bounds_mun,
-    labels_op=get_labels_mun,
     legend_pos_op=get_legend_pos_mun,
-    overlay_config_op=get_overlay_config_mun,
     partitions_def=mun_partitions,
 )
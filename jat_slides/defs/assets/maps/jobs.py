@@ -1,5 +1,4 @@
 import itertools
-from pathlib import Path
 
 import geopandas as gpd
 import jenkspy
@@ -7,24 +6,24 @@ import matplotlib as mpl
 import numpy as np
 import pandas as pd
 from dagster_components.partitions import zone_partitions
-from dagster_components.resources import PostGISResource
 from matplotlib.figure import Figure
 from matplotlib.legend import Legend
 
 import dagster as dg
+from jat_slides.defs.assets.maps.choropleth import (
+    add_class_legend,
+    get_class_colors,
+    plot_rasterized,
+    should_rasterize,
+)
 from jat_slides.defs.assets.maps.common import (
-    add_overlay,
     generate_figure,
     get_bounds_base,
     get_bounds_mun,
-    get_labels_mun,
-    get_labels_zone,
     get_linewidth,
-    get_overlay_config_mun,
-    get_overlay_config_zone,
 )
+from jat_slides.defs.assets.maps.lod import simplify_for_figure
 from jat_slides.defs.partitions import mun_partitions
-from jat_slides.defs.resources import PathResource
 
 
 def add_categorical_column(
@@ -56,51 +55,61 @@ def replace_categorical_legend(legend: Legend, label_map: dict[int, str]) -> Non
         text.set_text(label_map[int(text.get_text())])
 
 
-@dg.op(out=dg.Out(io_manager_key="plot_manager"))
+@dg.op(
+    ins={
+        "df": dg.In(metadata={"crs": "EPSG:4326"}),
+    },
+    out=dg.Out(io_manager_key="plot_manager"),
+)
 def plot_jobs(
-    context: dg.OpExecutionContext,
-    path_resource: PathResource,
-    postgis_resource: PostGISResource,
     df: gpd.GeoDataFrame,
     bounds: tuple[float, float, float, float],
     lw: float,
-    labels: dict[str, bool],
-    overlay_config: dict | None,
+    base_layer: dict[str, np.ndarray],
 ) -> Figure:
     cmap = mpl.colormaps["YlGn"]
 
-    df = df.to_crs("EPSG:4326")
-    df, label_map = add_categorical_column(df, "jobs", 6)
-
-    fig, ax = generate_figure(
-        *bounds,
-        add_mun_bounds=True,
-        add_mun_labels=labels["mun"],
-        add_state_bounds=False,
-        add_state_labels=labels["state"],
-        state_poly_kwargs={
-            "ls": "--",
-            "linewidth": 1.5,
-            "alpha": 1,
-            "edgecolor": "#006400",
-        },
-        mun_poly_kwargs={"linewidth": 0.3, "alpha": 0.2},
-        state_text_kwargs={"fontsize": 7, "color": "#006400", "alpha": 0.9},
-        population_grids_path=path_resource.pg_path,
-        postgis_resource=postgis_resource,
-    )
-    df.plot(
-        column="category",
-        legend=True,
-        categorical=True,
-        cmap=cmap,
-        ax=ax,
-        edgecolor="k",  # ty:ignore[invalid-argument-type]
-        lw=lw,
-        autolim=False,
-        aspect=None,
-        legend_kwds={"framealpha": 1, "title": "Número de empleos"},
-    )
+    fig, ax = generate_figure(*bounds, base_layer=base_layer)
+    legend_kwds = {"framealpha": 1, "title": "Número de empleos"}
+
+    if should_rasterize(df):
+        df, label_map = add_categorical_column(df, "jobs", 6)
+
+        categories, codes = np.unique(df["category"], return_inverse=True)
+        colors = get_class_colors(cmap, len(categories))
+        plot_rasterized(
+            df,
+            colors[codes],
+            ax=ax,
+            bounds=bounds,
+            edgecolor="k",
+            linewidth=lw,
+        )
+        add_class_legend(
+            colors,
+            [str(category) for category in categories],
+            ax=ax,
+            edgecolor="k",
+            linewidth=lw,
+            **legend_kwds,
+        )
+    else:
+        df = simplify_for_figure(df, bounds)
+        df, label_map = add_categorical_column(df, "jobs", 6)
+
+        df.plot(
+            column="category",
+            legend=True,
+            categorical=True,
+            cmap=cmap,
+            ax=ax,
+            edgecolor="k",  # ty:ignore[invalid-argument-type]
+            lw=lw,
+            autolim=False,
+            aspect=None,
+            legend_kwds=legend_kwds,
+        )
+
     leg = ax.get_legend()
 
     if leg is None:
@@ -110,11 +119,6 @@ def plot_jobs(
     replace_categorical_legend(leg, label_map)
     leg.set_zorder(9999)
 
-    overlay_dir = (
-        Path(path_resource.data_path) / "overlays" / str(context.partition_key)
-    )
-    add_overlay(overlay_dir, ax=ax, config=overlay_config)
-
     return fig
 
 
@@ -122,23 +126,30 @@ def jobs_plot_factory(
     level: str,
     *,
     bounds_op: dg.OpDefinition,
-    labels_op: dg.OpDefinition,
-    overlay_config_op: dg.OpDefinition,
     partitions_def: dg.PartitionsDefinition,
 ) -> dg.AssetsDefinition:
     @dg.graph_asset(
         name="jobs",
         key_prefix=f"plot_{level}",
-        ins={"df_jobs": dg.AssetIn(["jobs", level])},
+        ins={
+            "df_jobs": dg.AssetIn(["jobs", level]),
+            "base_layer": dg.AssetIn(key=[f"plot_{level}", "base_layer"]),
+        },
         partitions_def=partitions_def,
         group_name=f"plot_{level}",
     )
-    def _asset(df_jobs: gpd.GeoDataFrame) -> Figure:
+    def _asset(
+        df_jobs: gpd.GeoDataFrame,
+        base_layer: dict[str, np.ndarray],
+    ) -> Figure:
         lw = get_linewidth()
         bounds = bounds_op()
-        labels = labels_op()
-        overlay_config = overlay_config_op()
-        return plot_jobs(df_jobs, bounds, lw, labels, overlay_config)
+        return plot_jobs(
+            df_jobs,
+            bounds,
+            lw,
+            base_layer=base_layer,
+        )
 
     return _asset
 
@@ -146,14 +157,10 @@ def jobs_plot_factory(
 jobs_plot_zone = jobs_plot_factory(
     "zone",
     bounds_op=get_bounds_base,
-    labels_op=get_labels_zone,
-    overlay_config_op=get_overlay_config_zone,
     partitions_def=zone_partitions,
 )
 jobs_plot_mun = jobs_plot_factory(
     "mun",
     bounds_op=get_bounds_mun,
-    labels_op=get_labels_mun,
     partitions_def=mun_partitions,
-    overlay_config_op=get_overlay_config_mun,
 )
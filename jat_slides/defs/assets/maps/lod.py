@@ -0,0 +1,47 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+
+FIGSIZE = (8, 4.5)
+DPI = 250
+
+
+def get_pixel_tolerance(
+    xmin: float,
+    ymin: float,
+    xmax: float,
+    ymax: float,
+    *,
+    figsize: tuple[float, float] = FIGSIZE,
+    dpi: float = DPI,
+) -> float:
+    # The axes span the whole figure, so a pixel covers this much in data
+    # units. Half a pixel keeps the simplification invisible once rendered.
+    pixel_width = (xmax - xmin) / (figsize[0] * dpi)
+    pixel_height = (ymax - ymin) / (figsize[1] * dpi)
+    return max(pixel_width, pixel_height) / 2
+
+
+def simplify_for_figure(
+    df: gpd.GeoDataFrame,
+    bounds: tuple[float, float, float, float],
+) -> gpd.GeoDataFrame:
+    if len(df) == 0:
+        return df
+
+    tolerance = get_pixel_tolerance(*bounds)
+    geoms = df["geometry"].to_numpy()
+
+    # Simplifying the polygons as a coverage moves each shared edge once, so
+    # neighbours stay seamless. Coverage simplification rejects anything else,
+    # such as the collections make_valid can return, which is simplified one
+    # geometry at a time instead.
+    is_polygonal = np.isin(
+        shapely.get_type_id(geoms),
+        [shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON],
+    ) & ~shapely.is_empty(geoms)
+
+    out = shapely.simplify(geoms, tolerance, preserve_topology=True)
+    if is_polygonal.any():
+        out[is_polygonal] = shapely.coverage_simplify(geoms[is_polygonal], tolerance)
+    return df.assign(geometry=gpd.GeoSeries(out, index=df.index, crs=df.crs))
@@ -1,81 +1,67 @@
-from pathlib import Path
-
 import geopandas as gpd
 import matplotlib.colors as mcol
+import numpy as np
 from dagster_components.partitions import zone_partitions
-from dagster_components.resources import PostGISResource
 from matplotlib.figure import Figure
 
 import dagster as dg
+from jat_slides.defs.assets.maps.choropleth import plot_rasterized, should_rasterize
 from jat_slides.defs.assets.maps.common import (
-    add_overlay,
     add_pop_legend,
     cmap_rdbu,
     generate_figure,
     get_bounds_base,
     get_bounds_mun,
     get_cmap_bounds,
-    get_labels_zone,
     get_legend_pos_base,
     get_linewidth,
-    get_overlay_config_mun,
-    get_overlay_config_zone,
 )
+from jat_slides.defs.assets.maps.lod import simplify_for_figure
 from jat_slides.defs.partitions import mun_partitions
-from jat_slides.defs.resources import PathResource
 
 
-@dg.op(out=dg.Out(io_manager_key="plot_manager"))
+@dg.op(
+    ins={
+        "df": dg.In(metadata={"crs": "EPSG:4326"}),
+    },
+    out=dg.Out(io_manager_key="plot_manager"),
+)
 def plot_dataframe(
-    context: dg.OpExecutionContext,
-    path_resource: PathResource,
-    postgis_resource: PostGISResource,
     bounds: tuple[float, float, float, float],
     df: gpd.GeoDataFrame,
     lw: float,
-    labels: dict[str, bool],
     legend_pos: str,
-    overlay_config: dict | None,
+    base_layer: dict[str, np.ndarray],
 ) -> Figure:
-    fig, ax = generate_figure(
-        *bounds,
-        add_mun_bounds=True,
-        add_mun_labels=labels["mun"],
-        add_state_bounds=False,
-        add_state_labels=labels["state"],
-        state_poly_kwargs={
-            "ls": "--",
-            "linewidth": 1.5,
-            "alpha": 1,
-            "edgecolor": "#006400",
-        },
-        mun_poly_kwargs={"linewidth": 0.3, "alpha": 0.2},
-        state_text_kwargs={"fontsize": 7, "color": "#006400", "alpha": 0.9},
-        population_grids_path=path_resource.pg_path,
-        postgis_resource=postgis_resource,
-    )
+    fig, ax = generate_figure(*bounds, base_layer=base_layer)
 
     cmap_bounds = get_cmap_bounds(df["difference"].to_numpy(), 3)
     norm = mcol.BoundaryNorm(cmap_bounds, 256)
 
-    df.to_crs("EPSG:4326").plot(
-        column="difference",
-        ax=ax,
-        cmap=cmap_rdbu,
-        ec="k",
-        lw=lw,
-        autolim=False,
-        norm=norm,
-        aspect=None,
-    )
+    if should_rasterize(df):
+        plot_rasterized(
+            df,
+            cmap_rdbu(norm(df["difference"].to_numpy())),
+            ax=ax,
+            bounds=bounds,
+            edgecolor="k",
+            linewidth=lw,
+        )
+    else:
+        df = simplify_for_figure(df, bounds)
+        df.plot(
+            column="difference",
+            ax=ax,
+            cmap=cmap_rdbu,
+            ec="k",
+            lw=lw,
+            autolim=False,
+            norm=norm,
+            aspect=None,
+        )
 
     add_pop_legend(cmap_bounds, ax=ax, cmap=cmap_rdbu, legend_pos=legend_pos)
 
-    overlay_dir = (
-        Path(path_resource.data_path) / "overlays" / str(context.partition_key)
-    )
-    add_overlay(overlay_dir, ax=ax, config=overlay_config)
-
     return fig
 
 
@@ -84,30 +70,32 @@ def population_grid_plot_factory(
     suffix: str,
     *,
     bounds_op: dg.OpDefinition,
-    overlay_config_op: dg.OpDefinition,
     partitions_def: dg.PartitionsDefinition,
 ) -> dg.AssetsDefinition:
     @dg.graph_asset(
         name="population_grid",
         key_prefix=f"plot_{suffix}",
-        ins={"df": dg.AssetIn(key=["cells", suffix])},
+        ins={
+            "df": dg.AssetIn(key=["cells", suffix]),
+            "base_layer": dg.AssetIn(key=[f"plot_{suffix}", "base_layer"]),
+        },
         partitions_def=partitions_def,
         group_name=f"plot_{suffix}",
     )
-    def _asset(df: gpd.GeoDataFrame) -> Figure:
+    def _asset(
+        df: gpd.GeoDataFrame,
+        base_layer: dict[str, np.ndarray],
+    ) -> Figure:
         bounds = bounds_op()
         lw = get_linewidth()
-        labels = get_labels_zone()
         legend_pos = get_legend_pos_base()
-        overlay_config = overlay_config_op()
 
         return plot_dataframe(
             bounds,
             df,
             lw,
-            labels,
             legend_pos=legend_pos,
-            overlay_config=overlay_config,
+            base_layer=base_layer,
         )
 
     return _asset
@@ -117,7 +105,6 @@ population_grid_plot_zone = population_grid_plot_factory(
     "zone",
     partitions_def=zone_partitions,
     bounds_op=get_bounds_base,
-    overlay_config_op=get_overlay_config_zone,
 )
 
 
@@ -125,5 +112,4 @@ population_grid_plot_mun = population_grid_plot_factory(
     "mun",
     partitions_def=mun_partitions,
     bounds_op=get_bounds_mun,
-    overlay_config_op=get_overlay_config_mun,
 )
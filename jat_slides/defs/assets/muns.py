@@ -4,45 +4,94 @@ import geopandas as gpd
 import pandas as pd
 
 import dagster as dg
-from jat_slides.defs.partitions import mun_partitions
+from jat_slides.defs.partitions import (
+    get_mun_code,
+    mun_partitions,
+    mun_to_state_mapping,
+    state_partitions,
+)
 from jat_slides.defs.resources import PathResource
+from jat_slides.defs.store import GeoParquetStore
+from jat_slides.defs.validity import get_validity_table_path, repair_geometries
 
 
-def muns_factory(year: int) -> dg.AssetsDefinition:
+def muns_state_factory(year: int) -> dg.AssetsDefinition:
     @dg.asset(
         name=str(year),
-        key_prefix="muns",
-        partitions_def=mun_partitions,
-        io_manager_key="gpkg_manager",
+        key_prefix="muns_state",
+        partitions_def=state_partitions,
+        io_manager_key="parquet_manager",
+        metadata={"partition_col": "CVE_MUN", "sort_by": "CVEGEO"},
     )
     def _asset(
         context: dg.AssetExecutionContext,
         path_resource: PathResource,
     ) -> gpd.GeoDataFrame:
-        total_chars = len(context.partition_key)
-        if total_chars == 4:
-            ent = context.partition_key[0].rjust(2, "0")
-        else:
-            ent = context.partition_key[:2]
-
         agebs_dir_path = (
             Path(path_resource.pg_path) / "final" / "zone_agebs" / "shaped" / str(year)
         )
 
-        df = pd.concat(
-            [
-                gpd.read_file(path).to_crs("ESRI:54009")
-                for path in agebs_dir_path.glob(f"{ent}.*.gpkg")
-            ],
-        ).assign(geometry=lambda df: df["geometry"].make_valid())
+        paths = sorted(agebs_dir_path.glob(f"{context.partition_key}.*.gpkg"))
+        if not paths:
+            return gpd.GeoDataFrame(
+                columns=["CVEGEO", "CVE_MUN", "POBTOT"],
+                geometry=[],
+                crs="ESRI:54009",
+            )
 
-        code_prefix = context.partition_key.rjust(5, "0")
+        df = gpd.GeoDataFrame(
+            pd.concat(
+                [gpd.read_file(path).to_crs("ESRI:54009") for path in paths],
+                ignore_index=True,
+            ),
+        ).assign(CVE_MUN=lambda df: df["CVEGEO"].str[:5])
 
-        return gpd.GeoDataFrame(
-            df.loc[df["CVEGEO"].str.startswith(code_prefix), ["POBTOT", "geometry"]],
+        df, stats = repair_geometries(
+            df,
+            get_validity_table_path(
+                path_resource.data_path,
+                "muns_state",
+                str(year),
+                context.partition_key,
+            ),
         )
+        context.add_output_metadata(stats)
+
+        return gpd.GeoDataFrame(df[["CVEGEO", "CVE_MUN", "POBTOT", "geometry"]])
+
+    return _asset
+
+
+def muns_factory(year: int) -> dg.AssetsDefinition:
+    @dg.asset(
+        name=str(year),
+        key_prefix="muns",
+        ins={
+            "store": dg.AssetIn(
+                ["muns_state", str(year)],
+                partition_mapping=mun_to_state_mapping,
+            ),
+        },
+        partitions_def=mun_partitions,
+        io_manager_key="gpkg_manager",
+        metadata={"crs": "ESRI:54009"},
+    )
+    def _asset(
+        context: dg.AssetExecutionContext,
+        store: GeoParquetStore | None,
+    ) -> gpd.GeoDataFrame:
+        code = get_mun_code(context.partition_key)
+
+        if store is None or code not in store:
+            return gpd.GeoDataFrame(
+                columns=["CVEGEO", "POBTOT"],
+                geometry=[],
+                crs="ESRI:54009",
+            )
+        return store.read(code, columns=["CVEGEO", "POBTOT"])
 
     return _asset
 
 
+muns_state = [muns_state_factory(year) for year in (1990, 2000, 2010, 2020)]
 agebs = [muns_factory(year) for year in (1990, 2000, 2010, 2020)]
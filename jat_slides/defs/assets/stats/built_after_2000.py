@@ -1,9 +1,8 @@
-import numpy as np
-from affine import Affine
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
 from jat_slides.defs.partitions import mun_partitions
+from jat_slides.defs.raster import LazyRaster
 
 
 def built_after_2000_factory(
@@ -13,14 +12,15 @@ def built_after_2000_factory(
     @dg.asset(
         name="built_after_2000",
         key_prefix=f"stats_{suffix}",
-        ins={"built_data": dg.AssetIn(f"built_{suffix}")},
+        ins={"built_data": dg.AssetIn(f"built_{suffix}", metadata={"lazy": True})},
         partitions_def=partitions_def,
         io_manager_key="text_manager",
         group_name=f"stats_{suffix}",
     )
-    def _asset(built_data: tuple[np.ndarray, Affine]) -> float:
-        arr, _ = built_data
-        return (arr >= 2000).sum() / (arr > 0).sum()
+    def _asset(built_data: LazyRaster) -> float:
+        # Pixels built in [1, 2000) and in [2000, 65535], in a single pass.
+        counts = built_data.histogram([1, 2000, 65535])
+        return counts[1] / counts.sum()
 
     return _asset
 
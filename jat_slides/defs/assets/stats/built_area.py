@@ -1,103 +1,120 @@
-from pathlib import Path
-
-import geopandas as gpd
 import pandas as pd
-import rasterio as rio
-import rasterio.mask as rio_mask
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
+from jat_slides.defs.assets.ghsl import LABEL_YEARS, NODATA, get_band
 from jat_slides.defs.partitions import mun_partitions
-from jat_slides.defs.resources import PathResource
-
-YEARS = (1990, 2000, 2010, 2020)
-
+from jat_slides.defs.raster import LazyRaster
+from jat_slides.defs.zonal import zonal_sums
+
+
+def calculate_ageb_areas(
+    ghsl: LazyRaster,
+    labels: LazyRaster,
+    agebs: dict[int, pd.DataFrame],
+) -> pd.DataFrame:
+    dfs = []
+    for band, year in enumerate(LABEL_YEARS, start=1):
+        areas = zonal_sums(
+            labels.read(band),
+            ghsl.read(get_band(year)),
+            n_labels=len(agebs[year]),
+            nodata=NODATA,
+        )
+        dfs.append(
+            pd.DataFrame(
+                {
+                    "CVEGEO": agebs[year]["CVEGEO"].to_numpy(),
+                    "year": year,
+                    "area": areas,
+                },
+            ),
+        )
+    return pd.concat(dfs, ignore_index=True)
+
+
+def built_area_ageb_factory(
+    suffix: str,
+    *,
+    prefix: str,
+    partitions_def: dg.PartitionsDefinition,
+) -> dg.AssetsDefinition:
+    # Units are matched to the label rasters by position, so only their
+    # codes are needed.
+    metadata = {"columns": ["CVEGEO"], "read_geometry": False}
 
-def get_year_area_factory(year: int) -> dg.OpDefinition:
-    @dg.op(
-        name=f"get_year_area_{year}",
+    @dg.asset(
+        ins={
+            "agebs_1990": dg.AssetIn(key=[prefix, "1990"], metadata=metadata),
+            "agebs_2000": dg.AssetIn(key=[prefix, "2000"], metadata=metadata),
+            "agebs_2010": dg.AssetIn(key=[prefix, "2010"], metadata=metadata),
+            "agebs_2020": dg.AssetIn(key=[prefix, "2020"], metadata=metadata),
+            "ghsl": dg.AssetIn(key=["ghsl", suffix], metadata={"lazy": True}),
+            "labels": dg.AssetIn(key=["ghsl_labels", suffix], metadata={"lazy": True}),
+        },
+        name="built_area_ageb",
+        key_prefix=f"stats_{suffix}",
+        partitions_def=partitions_def,
+        io_manager_key="csv_manager",
+        group_name=f"stats_{suffix}",
     )
-    def _op(
-        path_resource: PathResource,
-        bounds: dict[int, list],
-    ) -> float:
-        fpath = Path(path_resource.ghsl_path) / "BUILT_100" / f"{year}.tif"
-        with rio.open(fpath, nodata=65535) as ds:
-            data, _ = rio_mask.mask(ds, bounds[year], crop=True, nodata=0)
-
-        data[data == 65535] = 0
-        return float(data.sum())
-
-    return _op
-
-
-get_year_area_ops = {year: get_year_area_factory(year) for year in range(1975, 2021, 5)}
-
-
-@dg.op
-def get_bounds(
-    agebs_1990: gpd.GeoDataFrame,
-    agebs_2000: gpd.GeoDataFrame,
-    agebs_2010: gpd.GeoDataFrame,
-    agebs_2020: gpd.GeoDataFrame,
-) -> dict[int, list]:
-    bounds = {}
-    for year, agebs in zip(
-        (1990, 2000, 2010, 2020),
-        (agebs_1990, agebs_2000, agebs_2010, agebs_2020),
-        strict=True,
-    ):
-        bounds[year] = agebs["geometry"].to_numpy().tolist()
-    return bounds
-
+    def _asset(
+        agebs_1990: pd.DataFrame,
+        agebs_2000: pd.DataFrame,
+        agebs_2010: pd.DataFrame,
+        agebs_2020: pd.DataFrame,
+        ghsl: LazyRaster,
+        labels: LazyRaster,
+    ) -> pd.DataFrame:
+        agebs = dict(
+            zip(
+                LABEL_YEARS,
+                (agebs_1990, agebs_2000, agebs_2010, agebs_2020),
+                strict=True,
+            ),
+        )
+        return calculate_ageb_areas(ghsl, labels, agebs)
 
-@dg.op(out=dg.Out(io_manager_key="csv_manager"))
-def concat_areas(areas: list[float]) -> pd.DataFrame:
-    return (
-        pd.DataFrame([areas], index=["area"], columns=YEARS)
-        .transpose()
-        .reset_index(names="year")
-    )
+    return _asset
 
 
 def built_area_factory(
     suffix: str,
     *,
-    prefix: str,
     partitions_def: dg.PartitionsDefinition,
 ) -> dg.AssetsDefinition:
-    @dg.graph_asset(
-        ins={
-            "agebs_1990": dg.AssetIn(key=[prefix, "1990"]),
-            "agebs_2000": dg.AssetIn(key=[prefix, "2000"]),
-            "agebs_2010": dg.AssetIn(key=[prefix, "2010"]),
-            "agebs_2020": dg.AssetIn(key=[prefix, "2020"]),
-        },
+    @dg.asset(
+        ins={"ageb_areas": dg.AssetIn(key=[f"stats_{suffix}", "built_area_ageb"])},
         name="built_area",
         key_prefix=f"stats_{suffix}",
         partitions_def=partitions_def,
+        io_manager_key="csv_manager",
         group_name=f"stats_{suffix}",
     )
-    def _asset(
-        agebs_1990: gpd.GeoDataFrame,
-        agebs_2000: gpd.GeoDataFrame,
-        agebs_2010: gpd.GeoDataFrame,
-        agebs_2020: gpd.GeoDataFrame,
-    ) -> pd.DataFrame:
-        bounds = get_bounds(agebs_1990, agebs_2000, agebs_2010, agebs_2020)
-
-        areas = []
-        for year in YEARS:
-            area_op = get_year_area_ops[year]
-            areas.append(area_op(bounds))
-        return concat_areas(areas)
+    def _asset(ageb_areas: pd.DataFrame) -> pd.DataFrame:
+        # Every cell carries a single label, so the per-AGEB sums add up to
+        # the built area inside the union of the AGEBs.
+        return (
+            ageb_areas.groupby("year")["area"]
+            .sum()
+            .reindex(LABEL_YEARS, fill_value=0.0)
+            .rename_axis("year")
+            .reset_index()
+        )
 
     return _asset
 
 
-built_area_zone = built_area_factory(
+built_area_ageb_zone = built_area_ageb_factory(
     "zone",
     prefix="agebs",
     partitions_def=zone_partitions,
 )
-built_area_mun = built_area_factory("mun", prefix="muns", partitions_def=mun_partitions)
+built_area_ageb_mun = built_area_ageb_factory(
+    "mun",
+    prefix="muns",
+    partitions_def=mun_partitions,
+)
+
+built_area_zone = built_area_factory("zone", partitions_def=zone_partitions)
+built_area_mun = built_area_factory("mun", partitions_def=mun_partitions)
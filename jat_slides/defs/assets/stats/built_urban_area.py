@@ -18,7 +18,7 @@ def calculate_built_urban_area(
         (agebs_1990, agebs_2000, agebs_2010, agebs_2020),
         strict=False,
     ):
-        area = agebs.to_crs("EPSG:6372").area.sum()
+        area = agebs.area.sum()
         out.append({"year": year, "area": area})
 
     return pd.DataFrame(out)
@@ -30,14 +30,17 @@ def built_urban_area_factory(
     prefix: str,
     partitions_def: dg.PartitionsDefinition,
 ) -> dg.AssetsDefinition:
+    # Areas are measured in the equal-area Mexican LCC projection.
+    metadata = {"crs": "EPSG:6372"}
+
     @dg.asset(
         name="built_urban_area",
         key_prefix=f"stats_{suffix}",
         ins={
-            "agebs_1990": dg.AssetIn(key=[prefix, "1990"]),
-            "agebs_2000": dg.AssetIn(key=[prefix, "2000"]),
-            "agebs_2010": dg.AssetIn(key=[prefix, "2010"]),
-            "agebs_2020": dg.AssetIn(key=[prefix, "2020"]),
+            "agebs_1990": dg.AssetIn(key=[prefix, "1990"], metadata=metadata),
+            "agebs_2000": dg.AssetIn(key=[prefix, "2000"], metadata=metadata),
+            "agebs_2010": dg.AssetIn(key=[prefix, "2010"], metadata=metadata),
+            "agebs_2020": dg.AssetIn(key=[prefix, "2020"], metadata=metadata),
         },
         partitions_def=partitions_def,
         group_name=f"stats_{suffix}",
@@ -1,4 +1,4 @@
-import geopandas as gpd
+import pandas as pd
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
@@ -13,12 +13,17 @@ def total_jobs_factory(
     @dg.asset(
         name="total_jobs",
         key_prefix=f"stats_{level}",
-        ins={"df_jobs": dg.AssetIn(["jobs", level])},
+        ins={
+            "df_jobs": dg.AssetIn(
+                ["jobs", level],
+                metadata={"columns": ["jobs"], "read_geometry": False},
+            ),
+        },
         partitions_def=partitions_def,
         io_manager_key="text_manager",
         group_name=f"stats_{level}",
     )
-    def _asset(df_jobs: gpd.GeoDataFrame) -> float:
+    def _asset(df_jobs: pd.DataFrame) -> float:
         return df_jobs["jobs"].sum()
 
     return _asset
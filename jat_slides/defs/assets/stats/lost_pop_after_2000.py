@@ -1,4 +1,4 @@
-import geopandas as gpd
+import pandas as pd
 from dagster_components.partitions import zone_partitions
 
 import dagster as dg
@@ -17,12 +17,17 @@ def lost_pop_after_2000_factory(suffix: str) -> dg.AssetsDefinition:
     @dg.asset(
         name="lost_pop_after_2000",
         key_prefix=f"stats_{suffix}",
-        ins={"df": dg.AssetIn(["cells", suffix])},
+        ins={
+            "df": dg.AssetIn(
+                ["cells", suffix],
+                metadata={"columns": ["difference"], "read_geometry": False},
+            ),
+        },
         partitions_def=partitions_def,
         group_name=f"stats_{suffix}",
         io_manager_key="text_manager",
     )
-    def _asset(df: gpd.GeoDataFrame) -> float:
+    def _asset(df: pd.DataFrame) -> float:
         return (df["difference"] < 0).sum() / len(df)
 
     return _asset
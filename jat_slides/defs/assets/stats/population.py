@@ -1,4 +1,3 @@
-import geopandas as gpd
 import pandas as pd
 from dagster_components.partitions import zone_partitions
 
@@ -7,10 +6,10 @@ from jat_slides.defs.partitions import mun_partitions
 
 
 def calculate_lost_pop(
-    agebs_1990: gpd.GeoDataFrame,
-    agebs_2000: gpd.GeoDataFrame,
-    agebs_2010: gpd.GeoDataFrame,
-    agebs_2020: gpd.GeoDataFrame,
+    agebs_1990: pd.DataFrame,
+    agebs_2000: pd.DataFrame,
+    agebs_2010: pd.DataFrame,
+    agebs_2020: pd.DataFrame,
 ) -> pd.DataFrame:
     pops = []
     for year, agebs in zip(
@@ -29,12 +28,14 @@ def population_factory(
     prefix: str,
     partitions_def: dg.PartitionsDefinition,
 ) -> dg.AssetsDefinition:
+    metadata = {"columns": ["POBTOT"], "read_geometry": False}
+
     @dg.asset(
         ins={
-            "agebs_1990": dg.AssetIn(key=[prefix, "1990"]),
-            "agebs_2000": dg.AssetIn(key=[prefix, "2000"]),
-            "agebs_2010": dg.AssetIn(key=[prefix, "2010"]),
-            "agebs_2020": dg.AssetIn(key=[prefix, "2020"]),
+            "agebs_1990": dg.AssetIn(key=[prefix, "1990"], metadata=metadata),
+            "agebs_2000": dg.AssetIn(key=[prefix, "2000"], metadata=metadata),
+            "agebs_2010": dg.AssetIn(key=[prefix, "2010"], metadata=metadata),
+            "agebs_2020": dg.AssetIn(key=[prefix, "2020"], metadata=metadata),
         },
         name="population",
         key_prefix=f"stats_{suffix}",
@@ -43,10 +44,10 @@ def population_factory(
         group_name=f"stats_{suffix}",
     )
     def _asset(
-        agebs_1990: gpd.GeoDataFrame,
-        agebs_2000: gpd.GeoDataFrame,
-        agebs_2010: gpd.GeoDataFrame,
-        agebs_2020: gpd.GeoDataFrame,
+        agebs_1990: pd.DataFrame,
+        agebs_2000: pd.DataFrame,
+        agebs_2010: pd.DataFrame,
+        agebs_2020: pd.DataFrame,
     ) -> pd.DataFrame:
         return calculate_lost_pop(agebs_1990, agebs_2000, agebs_2010, agebs_2020)
 
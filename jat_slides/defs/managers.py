@@ -1,4 +1,11 @@
+import functools
+import hashlib
+import itertools
 import os
+import re
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import assert_never
 
@@ -11,6 +18,8 @@ import rasterio.warp as rio_warp
 from affine import Affine
 from matplotlib.figure import Figure
 from pptx.presentation import Presentation
+from rasterio.enums import Resampling
+from rasterio.io import DatasetWriter
 
 from dagster import (
     ConfigurableIOManager,
@@ -18,12 +27,20 @@ from dagster import (
     OutputContext,
     ResourceDependency,
 )
+from jat_slides.defs.raster import LazyRaster
 from jat_slides.defs.resources import PathResource
+from jat_slides.defs.store import (
+    GeoParquetStore,
+    atomic_path,
+    read_parquet,
+    write_store,
+)
 
 
 class BaseManager(ConfigurableIOManager):
     path_resource: ResourceDependency[PathResource]
     extension: str
+    max_workers: int = 4
 
     def _get_path(
         self,
@@ -38,7 +55,7 @@ class BaseManager(ConfigurableIOManager):
                 final_path = final_path.with_suffix(final_path.suffix + self.extension)
             else:
                 final_path = {}
-                for key in context.asset_partition_keys:
+                for key in sorted(context.asset_partition_keys):
                     temp_path = fpath / key
                     temp_path = temp_path.with_suffix(temp_path.suffix + self.extension)
                     final_path[key] = temp_path
@@ -54,50 +71,319 @@ class BaseManager(ConfigurableIOManager):
             raise TypeError(err)
         return path
 
+    def _iter_partitions[T](
+        self,
+        paths: dict[str, Path],
+        loader: Callable[[Path], T],
+    ) -> Iterator[tuple[str, T]]:
+        items = iter(paths.items())
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # At most max_workers partitions are in flight or waiting to be
+            # consumed, and they are yielded in the order of the paths.
+            pending = deque(
+                (key, executor.submit(loader, fpath))
+                for key, fpath in itertools.islice(items, self.max_workers)
+            )
+            while pending:
+                key, future = pending.popleft()
+                for next_key, next_fpath in itertools.islice(items, 1):
+                    pending.append((next_key, executor.submit(loader, next_fpath)))
+                yield key, future.result()
+
+    def _load_partitions[T](
+        self,
+        paths: dict[str, Path],
+        loader: Callable[[Path], T],
+    ) -> dict[str, T]:
+        return dict(self._iter_partitions(paths, loader))
+
 
 class DataFrameIOManager(BaseManager):
+    row_group_size: int = 50_000
+
     def _is_geodataframe(self) -> bool:
         return self.extension in (".gpkg", ".geojson")
 
-    def handle_output(self, context: OutputContext, obj: gpd.GeoDataFrame) -> None:
+    def _is_parquet(self) -> bool:
+        return self.extension == ".parquet"
+
+    def _write_parquet(
+        self,
+        obj: pd.DataFrame,
+        fpath: Path,
+        *,
+        sort_by: str | None = None,
+    ) -> None:
+        if sort_by is not None:
+            obj = obj.sort_values(sort_by, kind="stable")
+
+        if not isinstance(obj, gpd.GeoDataFrame):
+            obj.to_parquet(fpath, index=False, row_group_size=self.row_group_size)
+            return
+
+        # Rows that are close in space end up in the same row group, so the
+        # bbox covering column lets readers skip most of the file.
+        valid = obj.geometry.notna() & ~obj.geometry.is_empty
+        if sort_by is None and valid.all() and len(obj) > 0:
+            obj = obj.iloc[np.argsort(obj.hilbert_distance().to_numpy(), kind="stable")]
+
+        obj.to_parquet(
+            fpath,
+            index=False,
+            row_group_size=self.row_group_size,
+            write_covering_bbox=True,
+            schema_version="1.1.0",
+        )
+
+    def _read_file(
+        self,
+        fpath: Path,
+        *,
+        columns: list[str] | None = None,
+        bbox: tuple[float, float, float, float] | None = None,
+        read_geometry: bool = True,
+    ) -> pd.DataFrame:
+        if self._is_parquet():
+            return read_parquet(
+                fpath,
+                columns=columns,
+                bbox=bbox,
+                read_geometry=read_geometry,
+            )
+        if self._is_geodataframe():
+            return gpd.read_file(
+                fpath,
+                columns=columns,
+                bbox=bbox,
+                read_geometry=read_geometry,
+            )
+        return pd.read_csv(fpath, usecols=columns)
+
+    def _get_crs_cache_prefix(self, fpath: Path, crs: str) -> str:
+        crs_slug = re.sub(r"[^0-9a-z]+", "_", crs.lower())
+        return f".{fpath.stem}.{crs_slug}"
+
+    def _get_crs_cache_path(self, fpath: Path, crs: str) -> Path:
+        stat = fpath.stat()
+        digest = hashlib.sha1(
+            f"{stat.st_mtime_ns}:{stat.st_size}".encode(),
+            usedforsecurity=False,
+        ).hexdigest()[:12]
+        prefix = self._get_crs_cache_prefix(fpath, crs)
+        return fpath.with_name(f"{prefix}.{digest}.parquet")
+
+    def _read_reprojected(
+        self,
+        fpath: Path,
+        crs: str,
+        *,
+        columns: list[str] | None = None,
+        bbox: tuple[float, float, float, float] | None = None,
+    ) -> gpd.GeoDataFrame:
+        # Reprojected copies are cached next to the source, named after its
+        # modification time and size, so a new materialization invalidates
+        # them.
+        cache_path = self._get_crs_cache_path(fpath, crs)
+        if not cache_path.exists():
+            prefix = self._get_crs_cache_prefix(fpath, crs)
+            for stale_path in fpath.parent.glob(f"{prefix}.*.parquet"):
+                stale_path.unlink(missing_ok=True)
+
+            df = self._read_file(fpath).to_crs(crs)
+            with atomic_path(cache_path) as tmp_path:
+                self._write_parquet(df, tmp_path)
+
+        return read_parquet(cache_path, columns=columns, bbox=bbox)
+
+    def _get_canonical_crs(self, context: InputContext) -> str | None:
+        if context.upstream_output is None:
+            return None
+        return (context.upstream_output.definition_metadata or {}).get("crs")
+
+    def _read_dataframe(self, fpath: Path, context: InputContext) -> pd.DataFrame:
+        metadata = context.definition_metadata or {}
+        columns = metadata.get("columns")
+        bbox = metadata.get("bbox")
+        if bbox is not None:
+            bbox = tuple(bbox)
+
+        # Attribute-only reads return a plain DataFrame and skip decoding
+        # the geometries altogether.
+        read_geometry = metadata.get("read_geometry", True)
+
+        # The bbox is given in the requested CRS.
+        crs = metadata.get("crs")
+        if (
+            read_geometry
+            and crs is not None
+            and crs != self._get_canonical_crs(context)
+        ):
+            return self._read_reprojected(fpath, crs, columns=columns, bbox=bbox)
+        return self._read_file(
+            fpath,
+            columns=columns,
+            bbox=bbox,
+            read_geometry=read_geometry,
+        )
+
+    def _write_store(
+        self,
+        context: OutputContext,
+        obj: pd.DataFrame | Iterable[tuple[str, pd.DataFrame]],
+        root: Path,
+    ) -> None:
+        metadata = context.definition_metadata
+        if isinstance(obj, pd.DataFrame):
+            partition_col = metadata["partition_col"]
+            parts: Iterable[tuple[str, pd.DataFrame]] = (
+                (str(key), df.drop(columns=[partition_col]))
+                for key, df in obj.groupby(partition_col, sort=True)
+            )
+        else:
+            parts = obj
+
+        index = write_store(
+            root,
+            parts,
+            functools.partial(self._write_parquet, sort_by=metadata.get("sort_by")),
+            index_cols=metadata.get("index_cols", ()),
+            range_cols=metadata.get("range_cols", ()),
+        )
+        context.add_output_metadata(
+            {"num_parts": len(index), "num_rows": int(index["count"].sum())},
+        )
+
+    def _load_store(self, fpath: Path) -> GeoParquetStore | None:
+        root = fpath.with_suffix("")
+        if not root.exists():
+            return None
+        return GeoParquetStore(root)
+
+    def _is_store(self, context: InputContext | OutputContext) -> bool:
+        if isinstance(context, InputContext):
+            upstream_output = context.upstream_output
+            if upstream_output is None:
+                return False
+            metadata = upstream_output.definition_metadata
+        else:
+            metadata = context.definition_metadata
+        return "partition_col" in (metadata or {})
+
+    def handle_output(
+        self,
+        context: OutputContext,
+        obj: pd.DataFrame | Iterable[tuple[str, pd.DataFrame]],
+    ) -> None:
         out_path = self._get_single_path(context)
         out_path.parent.mkdir(exist_ok=True, parents=True)
 
-        if self._is_geodataframe():
+        crs = (context.definition_metadata or {}).get("crs")
+        if crs is not None and isinstance(obj, gpd.GeoDataFrame):
+            # Empty and naive frames have nothing to transform, so they are
+            # only tagged with the canonical CRS.
+            if obj.crs is None or len(obj) == 0:
+                obj = obj.set_crs(crs, allow_override=True)
+            else:
+                obj = obj.to_crs(crs)
+
+        if self._is_store(context):
+            if not self._is_parquet():
+                err = "Partitioned stores are only supported for .parquet"
+                raise ValueError(err)
+            self._write_store(context, obj, out_path.with_suffix(""))
+        elif self._is_parquet():
+            self._write_parquet(
+                obj,
+                out_path,
+                sort_by=(context.definition_metadata or {}).get("sort_by"),
+            )
+        elif self._is_geodataframe():
             obj.to_file(out_path, mode="w")
         else:
             obj.to_csv(out_path, index=False)
 
     def load_input(
         self, context: InputContext
-    ) -> pd.DataFrame | dict[str, pd.DataFrame | None]:
+    ) -> (
+        pd.DataFrame
+        | GeoParquetStore
+        | dict[str, pd.DataFrame | GeoParquetStore | None]
+    ):
         path = self._get_path(context)
+        is_store = self._is_store(context)
 
         if isinstance(path, Path):
-            if self._is_geodataframe():
-                return gpd.read_file(path)
-            return pd.read_csv(path)
+            if is_store:
+                return self._load_store(path)
+            return self._read_dataframe(path, context)
 
         if isinstance(path, dict):
-            out_dict: dict[str, pd.DataFrame | None] = {}
-            for key, fpath in path.items():
+
+            def _loader(fpath: Path) -> pd.DataFrame | GeoParquetStore | None:
+                if is_store:
+                    return self._load_store(fpath)
                 if fpath.exists():
-                    if self._is_geodataframe():
-                        out_dict[key] = gpd.read_file(fpath)
-                    else:
-                        out_dict[key] = pd.read_csv(fpath)
-                else:
-                    out_dict[key] = None
-            return out_dict
+                    return self._read_dataframe(fpath, context)
+                return None
+
+            return self._load_partitions(path, _loader)
 
         assert_never(type(path))
 
 
 class RasterIOManager(BaseManager):
-    def _get_raster_and_transform(self, fpath: Path) -> tuple[np.ndarray, Affine]:
+    compress: str = "deflate"
+    blocksize: int = 512
+
+    def _get_creation_options(self) -> dict:
+        return {
+            "driver": "GTiff",
+            "tiled": True,
+            "blockxsize": self.blocksize,
+            "blockysize": self.blocksize,
+            "compress": self.compress,
+            "predictor": 2,
+            "BIGTIFF": "IF_SAFER",
+        }
+
+    def _build_overviews(self, ds: DatasetWriter) -> None:
+        factors = []
+        factor = 2
+        while max(ds.width, ds.height) / factor >= self.blocksize / 2:
+            factors.append(factor)
+            factor *= 2
+
+        if factors:
+            ds.build_overviews(factors, Resampling.nearest)
+            ds.update_tags(ns="rio_overview", resampling="nearest")
+
+    def _resolve_path(self, fpath: Path) -> Path:
+        return fpath
+
+    def _get_raster_and_transform(
+        self,
+        fpath: Path,
+        context: InputContext,
+    ) -> tuple[np.ndarray, Affine] | LazyRaster:
+        fpath = self._resolve_path(fpath)
+
+        metadata = context.definition_metadata or {}
+        if metadata.get("lazy", False):
+            return LazyRaster(fpath, block_rows=metadata.get("block_rows"))
+
+        max_size = metadata.get("max_size")
+
         with rio.open(fpath, "r") as ds:
-            data = ds.read(1)
-            transform = ds.transform
+            height, width = ds.height, ds.width
+            scale = 1.0 if max_size is None else max(1.0, max(height, width) / max_size)
+            out_shape = (max(1, round(height / scale)), max(1, round(width / scale)))
+
+            # GDAL serves reduced reads from the closest internal overview.
+            data = ds.read(1, out_shape=out_shape, resampling=Resampling.nearest)
+            transform = ds.transform * Affine.scale(
+                width / out_shape[1],
+                height / out_shape[0],
+            )
         return data, transform
 
     def handle_output(
@@ -109,62 +395,108 @@ class RasterIOManager(BaseManager):
         fpath.parent.mkdir(exist_ok=True, parents=True)
 
         arr, transform = obj
+        if arr.ndim == 2:
+            arr = arr[np.newaxis]
+
+        bands = (context.definition_metadata or {}).get("bands")
+        options = self._get_creation_options()
+        if arr.shape[0] > 1:
+            # Band interleaving keeps single-band reads from decoding the
+            # other bands.
+            options["interleave"] = "band"
+
         with rio.open(
             fpath,
             "w",
-            driver="GTiff",
-            count=1,
-            height=arr.shape[0],
-            width=arr.shape[1],
+            count=arr.shape[0],
+            height=arr.shape[1],
+            width=arr.shape[2],
             dtype="uint16",
-            compress="w",
             crs="ESRI:54009",
             transform=transform,
+            **options,
         ) as ds:
-            ds.write(arr, 1)
+            ds.write(arr)
+            if bands is not None:
+                for bidx, band in enumerate(bands, start=1):
+                    ds.set_band_description(bidx, str(band))
+            self._build_overviews(ds)
 
     def load_input(
         self, context: InputContext
-    ) -> tuple[np.ndarray, Affine] | dict[str, tuple[np.ndarray, Affine]]:
+    ) -> (
+        tuple[np.ndarray, Affine]
+        | LazyRaster
+        | dict[str, tuple[np.ndarray, Affine] | LazyRaster]
+    ):
         path = self._get_path(context)
         if isinstance(path, Path):
-            data, transform = self._get_raster_and_transform(path)
-            return data, transform
+            return self._get_raster_and_transform(path, context)
 
         if isinstance(path, dict):
-            out_dict: dict[str, tuple[np.ndarray, Affine]] = {}
-            for key, fpath in path.items():
-                out_dict[key] = self._get_raster_and_transform(fpath)
-            return out_dict
+            return self._load_partitions(
+                path,
+                lambda fpath: self._get_raster_and_transform(fpath, context),
+            )
 
         assert_never(type(path))
 
 
 class ReprojectedRasterIOManager(RasterIOManager):
     crs: str
+    resampling: str = "nearest"
+
+    def _get_cache_path(self, fpath: Path) -> Path:
+        crs_slug = re.sub(r"[^0-9a-z]+", "_", self.crs.lower())
+        return fpath.with_name(f"{fpath.stem}.{crs_slug}{fpath.suffix}")
+
+    def _get_cache_key(self, fpath: Path) -> str:
+        stat = fpath.stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}:{self.crs}:{self.resampling}"
+
+    def _is_cache_valid(self, cache_path: Path, cache_key: str) -> bool:
+        if not cache_path.exists():
+            return False
+        with rio.open(cache_path) as ds:
+            return ds.tags().get("REPROJECTION_KEY") == cache_key
 
-    def _get_raster_and_transform(self, fpath: Path) -> tuple[np.ndarray, Affine]:
-        with rio.open(fpath) as ds:
+    def _write_cache(self, fpath: Path, cache_path: Path, cache_key: str) -> None:
+        with rio.open(fpath) as src, atomic_path(cache_path) as tmp_path:
             transform, width, height = rio_warp.calculate_default_transform(
-                ds.crs,
+                src.crs,
                 self.crs,
-                ds.width,
-                ds.height,
-                *ds.bounds,
+                src.width,
+                src.height,
+                *src.bounds,
             )
 
-            data = np.zeros((height, width), dtype=int)
-            rio.warp.reproject(
-                ds.read(1),
-                data,
-                src_transform=ds.transform,
-                src_crs=ds.crs,
-                dst_transform=transform,
-                dst_crs=self.crs,
-                resampling=rio.warp.Resampling.nearest,
-            )
-
-        return data, transform
+            with rio.open(
+                tmp_path,
+                "w",
+                count=1,
+                height=height,
+                width=width,
+                dtype=src.dtypes[0],
+                crs=self.crs,
+                transform=transform,
+                **self._get_creation_options(),
+            ) as dst:
+                rio_warp.reproject(
+                    rio.band(src, 1),
+                    rio.band(dst, 1),
+                    resampling=Resampling[self.resampling],
+                )
+                self._build_overviews(dst)
+                dst.update_tags(REPROJECTION_KEY=cache_key)
+
+    def _resolve_path(self, fpath: Path) -> Path:
+        cache_path = self._get_cache_path(fpath)
+        cache_key = self._get_cache_key(fpath)
+
+        if not self._is_cache_valid(cache_path, cache_key):
+            self._write_cache(fpath, cache_path, cache_key)
+
+        return cache_path
 
 
 class PresentationIOManager(BaseManager):
@@ -206,20 +538,38 @@ class TextIOManager(BaseManager):
         with fpath.open("w", encoding="utf8") as f:
             f.write(f"{obj:.10f}")
 
+    def _read_float(self, fpath: Path) -> float | None:
+        if not fpath.exists():
+            return None
+        with fpath.open(encoding="utf8") as f:
+            return float(f.readline().strip("\n"))
+
     def load_input(
         self,
         context: InputContext,
     ) -> float | dict[str, float | None]:
-        fpath = self._get_single_path(context)
+        fpath = self._get_path(context)
         if isinstance(fpath, os.PathLike):
             with fpath.open(encoding="utf8") as f:
-                out = float(f.readline().strip("\n"))
-        else:
-            out = {}
-            for key, subpath in fpath.items():
-                if subpath.exists():
-                    with subpath.open(encoding="utf8") as f:
-                        out[key] = float(f.readline().strip("\n"))
-                else:
-                    out[key] = None
-        return out
+                return float(f.readline().strip("\n"))
+        return self._load_partitions(fpath, self._read_float)
+
+
+class ArrayIOManager(BaseManager):
+    def handle_output(self, context: OutputContext, obj: dict[str, np.ndarray]) -> None:
+        fpath = self._get_single_path(context)
+        fpath.parent.mkdir(exist_ok=True, parents=True)
+        np.savez_compressed(fpath, **obj)
+
+    def _read_arrays(self, fpath: Path) -> dict[str, np.ndarray]:
+        with np.load(fpath) as arrays:
+            return dict(arrays)
+
+    def load_input(
+        self,
+        context: InputContext,
+    ) -> dict[str, np.ndarray] | dict[str, dict[str, np.ndarray]]:
+        fpath = self._get_path(context)
+        if isinstance(fpath, os.PathLike):
+            return self._read_arrays(fpath)
+        return self._load_partitions(fpath, self._read_arrays)
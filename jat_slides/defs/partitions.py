@@ -11,3 +11,25 @@ import dagster as dg
 # mun_partitions = StaticPartitionsDefinition(mun_list)
 
 mun_partitions = dg.StaticPartitionsDefinition(["01001"])
+
+state_partitions = dg.StaticPartitionsDefinition([f"{i:02d}" for i in range(1, 33)])
+
+
+def get_mun_code(partition_key: str) -> str:
+    return partition_key.rjust(5, "0")
+
+
+def get_ent_code(partition_key: str) -> str:
+    return get_mun_code(partition_key)[:2]
+
+
+mun_to_state_mapping = dg.StaticPartitionMapping(
+    {
+        ent: [
+            key
+            for key in mun_partitions.get_partition_keys()
+            if get_ent_code(key) == ent
+        ]
+        for ent in state_partitions.get_partition_keys()
+    },
+)
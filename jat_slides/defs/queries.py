@@ -0,0 +1,83 @@
+import re
+from typing import Any
+
+import geopandas as gpd
+import pandas as pd
+from dagster_components.resources import PostGISResource
+
+# SRID of the geometry columns of the census tables.
+SOURCE_CRS = "EPSG:6372"
+
+QUERIES = {
+    "agebs_national": """
+        SELECT
+            ST_AsBinary(census_2020_ageb.geometry) AS geometry,
+            census_2020_ageb."CVEGEO",
+            census_2020_ageb."POBTOT",
+            census_2020_mun."CVE_MET"
+        FROM census_2020_ageb
+        INNER JOIN census_2020_mun
+            ON census_2020_ageb."CVE_MUN" = census_2020_mun."CVEGEO"
+        WHERE census_2020_mun."CVE_MET" IS NOT NULL
+    """,
+    "boundaries_mun": """
+        SELECT
+            ST_AsBinary(census_2020_mun.geometry) AS geometry,
+            census_2020_mun."CVEGEO",
+            census_2020_mun."NOM_MUN" AS name
+        FROM census_2020_mun
+    """,
+    "boundaries_ent": """
+        SELECT
+            ST_AsBinary(census_2020_ent.geometry) AS geometry,
+            census_2020_ent."CVEGEO",
+            census_2020_ent."NOM_ENT" AS name
+        FROM census_2020_ent
+    """,
+}
+
+PARAM_PATTERN = re.compile(r"%\((\w+)\)s")
+
+
+def get_query_params(name: str) -> list[str]:
+    return list(dict.fromkeys(PARAM_PATTERN.findall(QUERIES[name])))
+
+
+def prepare_queries(dbapi_connection: Any) -> None:  # noqa: ANN401
+    cursor = dbapi_connection.cursor()
+    for name, sql in QUERIES.items():
+        params = get_query_params(name)
+        positional_sql = PARAM_PATTERN.sub(
+            lambda match, params=params: f"${params.index(match.group(1)) + 1}",
+            sql,
+        )
+        cursor.execute(f"PREPARE {name} AS {positional_sql}")
+    cursor.close()
+    dbapi_connection.commit()
+
+
+def get_query(postgis_resource: PostGISResource, name: str) -> str:
+    if not getattr(postgis_resource, "prepare_statements", False):
+        return QUERIES[name]
+
+    params = get_query_params(name)
+    if not params:
+        return f"EXECUTE {name}"
+
+    args = ", ".join(f"%({param})s" for param in params)
+    return f"EXECUTE {name}({args})"
+
+
+def read_geometry_query(
+    postgis_resource: PostGISResource,
+    name: str,
+    *,
+    params: dict | None = None,
+) -> gpd.GeoDataFrame:
+    # Geometries come back as binary WKB from ST_AsBinary, which avoids the
+    # hex encoding read_postgis has to decode.
+    with postgis_resource.connect() as conn:
+        df = pd.read_sql(get_query(postgis_resource, name), conn, params=params)
+
+    geometry = gpd.GeoSeries.from_wkb(df["geometry"].map(bytes), crs=SOURCE_CRS)
+    return gpd.GeoDataFrame(df.drop(columns=["geometry"]), geometry=geometry)
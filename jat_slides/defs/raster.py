@@ -0,0 +1,68 @@
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import rasterio as rio
+import rasterio.windows as rio_windows
+
+if TYPE_CHECKING:
+    from affine import Affine
+
+
+class LazyRaster:
+    def __init__(self, fpath: Path, *, block_rows: int | None = None) -> None:
+        self.path = fpath
+
+        with rio.open(fpath) as ds:
+            self.transform: Affine = ds.transform
+            self.crs = ds.crs
+            self.n_bands: int = ds.count
+            self.height: int = ds.height
+            self.width: int = ds.width
+            self.dtype = np.dtype(ds.dtypes[0])
+            natural_rows = ds.block_shapes[0][0]
+
+        if block_rows is None:
+            block_rows = natural_rows
+        # Whole internal blocks per strip, so no tile is decoded twice.
+        self.block_rows = max(1, block_rows // natural_rows) * natural_rows
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.height, self.width
+
+    def read(
+        self,
+        band: int = 1,
+        *,
+        window: rio_windows.Window | None = None,
+    ) -> np.ndarray:
+        with rio.open(self.path) as ds:
+            return ds.read(band, window=window)
+
+    def iter_blocks(
+        self,
+        band: int = 1,
+    ) -> Iterator[tuple[rio_windows.Window, np.ndarray]]:
+        windows = [
+            rio_windows.Window(
+                0,
+                row_off,
+                self.width,
+                min(self.block_rows, self.height - row_off),
+            )
+            for row_off in range(0, self.height, self.block_rows)
+        ]
+
+        with rio.open(self.path) as ds:
+            for window in windows:
+                yield window, ds.read(band, window=window)
+
+    def histogram(self, bins: np.ndarray | list[float], band: int = 1) -> np.ndarray:
+        bins = np.asarray(bins)
+        counts = np.zeros(len(bins) - 1, dtype=np.int64)
+        for _, block in self.iter_blocks(band):
+            block_counts, _ = np.histogram(block, bins=bins)
+            counts += block_counts
+        return counts
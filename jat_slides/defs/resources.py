@@ -1,4 +1,19 @@
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import sqlalchemy as sa
+from dagster_components.resources import PostGISResource
+
 from dagster import ConfigurableResource
+from jat_slides.defs.queries import prepare_queries
+
+# Engines are shared by every resource instance with the same settings in a
+# process, so ops in the same run reuse pooled connections.
+_ENGINES: dict[tuple, sa.Engine] = {}
+_ENGINES_LOCK = threading.Lock()
 
 
 class PathResource(ConfigurableResource):
@@ -32,3 +47,58 @@ class ConfigResource(ConfigurableResource):
     legend_pos: dict[str, str] | None = None
     add_labels: dict[str, list[str]] | None = None
     overlays: dict[str, dict[str, dict]] | None = None
+
+
+class PooledPostGISResource(PostGISResource):
+    pool_size: int = 5
+    max_overflow: int = 5
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    prepare_statements: bool = True
+
+    def _get_engine(self) -> sa.Engine:
+        key = (
+            os.getpid(),
+            self.host,
+            self.port,
+            self.user,
+            self.db,
+            self.pool_size,
+            self.max_overflow,
+            self.prepare_statements,
+        )
+
+        with _ENGINES_LOCK:
+            engine = _ENGINES.get(key)
+            if engine is None:
+                url = sa.URL.create(
+                    "postgresql+psycopg2",
+                    username=self.user,
+                    password=self.password,
+                    host=self.host,
+                    port=int(self.port),
+                    database=self.db,
+                )
+                engine = sa.create_engine(
+                    url,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_timeout=self.pool_timeout,
+                    pool_recycle=self.pool_recycle,
+                    pool_pre_ping=True,
+                )
+
+                if self.prepare_statements:
+
+                    def _on_connect(dbapi_connection: Any, _: Any) -> None:  # noqa: ANN401
+                        prepare_queries(dbapi_connection)
+
+                    sa.event.listen(engine, "connect", _on_connect)
+
+                _ENGINES[key] = engine
+        return engine
+
+    @contextmanager
+    def connect(self) -> Iterator[sa.Connection]:
+        with self._get_engine().connect() as conn:
+            yield conn
@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow.parquet as pq
+import shapely
+
+INDEX_NAME = "_index.parquet"
+
+
+@contextmanager
+def atomic_path(fpath: Path) -> Iterator[Path]:
+    # Yields a temporary path next to fpath that replaces it once the block
+    # finishes, so readers never see a half-written file.
+    tmp_path = fpath.with_name(f".{fpath.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp_path
+        tmp_path.replace(fpath)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def read_parquet(
+    fpath: Path,
+    *,
+    columns: list[str] | None = None,
+    bbox: tuple[float, float, float, float] | None = None,
+    filters: list | None = None,
+    read_geometry: bool = True,
+) -> pd.DataFrame:
+    geo_metadata = pq.read_schema(fpath).metadata.get(b"geo")
+    if geo_metadata is None:
+        return pd.read_parquet(fpath, columns=columns, filters=filters)
+
+    geo_metadata = json.loads(geo_metadata)
+    geometry_col = geo_metadata["primary_column"]
+    if not read_geometry:
+        if columns is None:
+            # The bbox covering column belongs to the geometry as well.
+            covering = geo_metadata["columns"][geometry_col].get("covering", {})
+            skip = {geometry_col}
+            if "bbox" in covering:
+                skip.add(covering["bbox"]["xmin"][0])
+            columns = [name for name in pq.read_schema(fpath).names if name not in skip]
+        return pd.read_parquet(fpath, columns=columns, filters=filters)
+
+    if columns is not None and geometry_col not in columns:
+        columns = [*columns, geometry_col]
+    return gpd.read_parquet(fpath, columns=columns, bbox=bbox, filters=filters)
+
+
+def summarize_part(
+    key: str,
+    df: pd.DataFrame,
+    *,
+    index_cols: Sequence[str] = (),
+    range_cols: Sequence[str] = (),
+) -> dict:
+    summary: dict = {"key": key, "count": len(df)}
+    if len(df) == 0:
+        return summary
+
+    # Index columns hold a single value per part, so they are kept in the
+    # index only.
+    for col in index_cols:
+        summary[col] = df[col].iloc[0]
+    for col in range_cols:
+        summary[f"min_{col}"] = df[col].min()
+        summary[f"max_{col}"] = df[col].max()
+    if isinstance(df, gpd.GeoDataFrame):
+        minx, miny, maxx, maxy = df.total_bounds
+        summary.update(minx=minx, miny=miny, maxx=maxx, maxy=maxy)
+    return summary
+
+
+def write_store(
+    root: Path,
+    parts: Iterable[tuple[str, pd.DataFrame]],
+    writer: Callable[[pd.DataFrame, Path], None],
+    *,
+    index_cols: Sequence[str] = (),
+    range_cols: Sequence[str] = (),
+) -> pd.DataFrame:
+    # Parts are written next to the old store and swapped in at the end, so
+    # readers never see a half-written store.
+    tmp_root = root.with_name(f".{root.name}.tmp")
+    if tmp_root.exists():
+        shutil.rmtree(tmp_root)
+    tmp_root.mkdir(parents=True)
+
+    summaries = []
+    for key, df in parts:
+        writer(df.drop(columns=list(index_cols)), tmp_root / f"{key}.parquet")
+        summaries.append(
+            summarize_part(key, df, index_cols=index_cols, range_cols=range_cols),
+        )
+
+    index = pd.DataFrame(
+        summaries,
+        columns=[
+            "key",
+            "count",
+            *index_cols,
+            "minx",
+            "miny",
+            "maxx",
+            "maxy",
+            *(f"{bound}_{col}" for col in range_cols for bound in ("min", "max")),
+        ],
+    )
+    index.to_parquet(tmp_root / INDEX_NAME, index=False)
+
+    if root.exists():
+        shutil.rmtree(root)
+    tmp_root.rename(root)
+    return index
+
+
+class GeoParquetStore:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._index: pd.DataFrame | None = None
+
+    @property
+    def index(self) -> pd.DataFrame:
+        if self._index is None:
+            self._index = pd.read_parquet(self.root / INDEX_NAME).set_index("key")
+        return self._index
+
+    def keys(self) -> list[str]:
+        return self.index.index.tolist()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index.index
+
+    def _get_part_path(self, key: str) -> Path:
+        if key not in self:
+            err = f"Key '{key}' not found in store {self.root}"
+            raise KeyError(err)
+        return self.root / f"{key}.parquet"
+
+    def read(
+        self,
+        key: str,
+        *,
+        columns: list[str] | None = None,
+        bbox: tuple[float, float, float, float] | None = None,
+        filters: list | None = None,
+    ) -> pd.DataFrame:
+        return read_parquet(
+            self._get_part_path(key),
+            columns=columns,
+            bbox=bbox,
+            filters=filters,
+        )
+
+    def keys_in_bbox(self, bbox: tuple[float, float, float, float]) -> list[str]:
+        xmin, ymin, xmax, ymax = bbox
+        index = self.index
+        mask = (
+            (index["minx"] <= xmax)
+            & (index["maxx"] >= xmin)
+            & (index["miny"] <= ymax)
+            & (index["maxy"] >= ymin)
+        )
+        return index.index[mask].tolist()
+
+    def read_bbox(
+        self,
+        bbox: tuple[float, float, float, float],
+        *,
+        columns: list[str] | None = None,
+    ) -> gpd.GeoDataFrame:
+        parts = [
+            self.read(key, columns=columns, bbox=bbox)
+            for key in self.keys_in_bbox(bbox)
+        ]
+        if not parts:
+            return gpd.GeoDataFrame(columns=columns or [], geometry=[])
+
+        df = gpd.GeoDataFrame(pd.concat(parts, ignore_index=True))
+        # The bbox filter compares row bounding boxes, not the geometries.
+        return df.loc[df.intersects(shapely.box(*bbox))]
@@ -0,0 +1,78 @@
+import hashlib
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from jat_slides.defs.store import atomic_path
+
+
+def _fingerprint(wkb: bytes | None) -> str | None:
+    if wkb is None:
+        return None
+    return hashlib.sha1(wkb, usedforsecurity=False).hexdigest()
+
+
+def repair_geometries(
+    df: gpd.GeoDataFrame,
+    table_path: Path,
+    *,
+    key_col: str = "CVEGEO",
+) -> tuple[gpd.GeoDataFrame, dict[str, int]]:
+    geoms = df.geometry.to_numpy()
+    fingerprints = np.array(
+        [_fingerprint(wkb) for wkb in shapely.to_wkb(geoms)],
+        dtype=object,
+    )
+
+    # The side table remembers every geometry already seen, keyed by its
+    # WKB, along with the repaired WKB of those that were invalid.
+    if table_path.exists():
+        table = pd.read_parquet(table_path).set_index("fingerprint")
+    else:
+        table = pd.DataFrame(
+            {key_col: pd.Series(dtype=str), "repaired": pd.Series(dtype=object)},
+            index=pd.Index([], name="fingerprint", dtype=str),
+        )
+
+    present = pd.notna(fingerprints)
+    known = present & np.isin(fingerprints, table.index)
+    unknown = present & ~known
+
+    out = geoms.copy()
+
+    known_repaired = table["repaired"].reindex(fingerprints[known]).to_numpy()
+    cached = np.flatnonzero(known)[pd.notna(known_repaired)]
+    out[cached] = shapely.from_wkb(known_repaired[pd.notna(known_repaired)])
+
+    checked = np.flatnonzero(unknown)
+    invalid = checked[~shapely.is_valid(geoms[checked])]
+    out[invalid] = shapely.make_valid(geoms[invalid])
+
+    repaired = np.full(len(checked), None, dtype=object)
+    repaired[np.isin(checked, invalid)] = shapely.to_wkb(out[invalid])
+    new_rows = pd.DataFrame(
+        {key_col: df[key_col].to_numpy()[checked], "repaired": repaired},
+        index=pd.Index(fingerprints[checked], name="fingerprint"),
+    )
+
+    # Entries for geometries that are gone are dropped.
+    table = pd.concat([table.loc[table.index.isin(fingerprints)], new_rows])
+    table = table.loc[~table.index.duplicated()]
+
+    table_path.parent.mkdir(exist_ok=True, parents=True)
+    with atomic_path(table_path) as tmp_path:
+        table.reset_index().to_parquet(tmp_path, index=False)
+
+    stats = {
+        "num_checked": len(checked),
+        "num_repaired": len(cached) + len(invalid),
+    }
+    geometry = gpd.GeoSeries(out, index=df.index, crs=df.crs)
+    return df.assign(**{df.geometry.name: geometry}), stats
+
+
+def get_validity_table_path(data_path: str | Path, *parts: str) -> Path:
+    return Path(data_path, "generated", "validity", *parts).with_suffix(".parquet")
@@ -0,0 +1,51 @@
+from collections.abc import Sequence
+
+import numpy as np
+import rasterio.features as rio_features
+import shapely
+from affine import Affine
+
+# Labels are stored as uint16, with 0 left for cells outside every unit.
+MAX_LABELS = np.iinfo(np.uint16).max - 1
+
+
+def rasterize_labels(
+    geoms: Sequence[shapely.Geometry],
+    *,
+    out_shape: tuple[int, int],
+    transform: Affine,
+) -> np.ndarray:
+    if len(geoms) > MAX_LABELS:
+        err = f"Cannot rasterize {len(geoms)} units, the maximum is {MAX_LABELS}"
+        raise ValueError(err)
+
+    if len(geoms) == 0:
+        return np.zeros(out_shape, dtype=np.uint16)
+
+    # Unit i gets label i + 1, so labels index back into the unit table.
+    return rio_features.rasterize(
+        zip(geoms, range(1, len(geoms) + 1), strict=True),
+        out_shape=out_shape,
+        transform=transform,
+        fill=0,
+        dtype=np.uint16,
+    )
+
+
+def zonal_sums(
+    labels: np.ndarray,
+    values: np.ndarray,
+    *,
+    n_labels: int,
+    nodata: float | None = None,
+) -> np.ndarray:
+    valid = labels > 0
+    if nodata is not None:
+        valid &= values != nodata
+
+    sums = np.bincount(
+        labels[valid],
+        weights=values[valid].astype(float),
+        minlength=n_labels + 1,
+    )
+    return sums[1:]
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import geopandas as gpd
+import shapely
+
+import dagster as dg
+from jat_slides.defs.assets.income import income
+from jat_slides.defs.managers import DataFrameIOManager
+from jat_slides.defs.resources import PathResource
+from jat_slides.defs.store import GeoParquetStore, write_store
+
+
+def get_path_resource(data_path: Path) -> PathResource:
+    return PathResource(
+        pg_path="",
+        ghsl_path="",
+        segregation_path="",
+        jobs_path="",
+        data_path=str(data_path),
+    )
+
+
+def test_zone_without_income_is_written(tmp_path: Path) -> None:
+    part = gpd.GeoDataFrame(
+        {"cvegeo": ["0900200010010"], "zone": ["09.1.01"], "state": ["09"]},
+        geometry=[shapely.box(-99.2, 19.4, -99.1, 19.5)],
+        crs="EPSG:4326",
+    )
+    write_store(
+        tmp_path / "catalog",
+        [("09.1.01.0", part)],
+        lambda df, fpath: df.to_parquet(fpath, index=False),
+        index_cols=["zone", "state"],
+    )
+    catalog = GeoParquetStore(tmp_path / "catalog")
+
+    df = income(dg.build_asset_context(partition_key="01.1.01"), catalog=catalog)
+
+    manager = DataFrameIOManager(
+        path_resource=get_path_resource(tmp_path),
+        extension=".gpkg",
+    )
+    output_context = dg.build_output_context(
+        asset_key=income.key,
+        partition_key="01.1.01",
+        definition_metadata=income.metadata_by_key[income.key],
+    )
+    manager.handle_output(output_context, df)
+
+    loaded = manager.load_input(
+        dg.build_input_context(
+            asset_key=income.key,
+            partition_key="01.1.01",
+            upstream_output=output_context,
+        ),
+    )
+    assert len(loaded) == 0
+    assert loaded.crs == "EPSG:4326"
@@ -0,0 +1,38 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from jat_slides.defs.assets.jobs import count_jobs_on_grid, get_regular_grid
+
+
+def test_count_jobs_on_grid_skips_missing_weights() -> None:
+    units = gpd.GeoDataFrame(
+        {"codigo": ["a", "b", "c", "d"]},
+        geometry=[
+            shapely.box(0, 0, 1, 1),
+            shapely.box(1, 0, 2, 1),
+            shapely.box(0, 1, 1, 2),
+            shapely.box(1, 1, 2, 2),
+        ],
+        crs="EPSG:6372",
+    )
+    jobs = gpd.GeoDataFrame(
+        {"num_empleos_esperados": [1.0, np.nan, 2.0, 4.0, np.nan]},
+        geometry=gpd.points_from_xy(
+            [0.2, 0.5, 0.8, 1.5, 0.5],
+            [0.2, 0.5, 0.8, 0.5, 1.5],
+        ),
+        crs="EPSG:6372",
+    )
+
+    grid = get_regular_grid(units)
+    assert grid is not None
+
+    job_count = count_jobs_on_grid(units, jobs, grid, index_col="codigo")
+    expected = (
+        units.sjoin(jobs, how="inner", predicate="contains")
+        .groupby("codigo")["num_empleos_esperados"]
+        .sum()
+    )
+    assert job_count.to_dict() == {"a": 3.0, "b": 4.0, "c": 0.0}
+    assert job_count.to_dict() == expected.to_dict()